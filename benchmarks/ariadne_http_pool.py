@@ -0,0 +1,104 @@
+"""Benchmark of the HTTP pool settings of the graia-ariadne component.
+
+Accounts send bursts of requests to a local stand-in of mirai-api-http, with per-account sessions
+and with a session shared by all of them under several pool settings.
+
+    python benchmarks/ariadne_http_pool.py --accounts 40
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from aiohttp import ClientSession, TCPConnector, web
+
+from luma.bundled.components.ariadne_http import create_session
+from luma.bundled.components.graia_ariadne import HttpPoolConfig
+from luma.convert import Duration
+
+
+async def run_scenario(
+    url: str, sessions: List[ClientSession], bursts: int, requests: int, gap: float
+) -> Tuple[float, List[float]]:
+    """Send bursts of sequential requests from each account, returning the elapsed time and the latencies"""
+    latencies: List[float] = []
+
+    async def account(session: ClientSession) -> None:
+        for _ in range(bursts):
+            for _ in range(requests):
+                start = time.perf_counter()
+                async with session.get(url) as response:
+                    await response.read()
+                latencies.append(time.perf_counter() - start)
+            await asyncio.sleep(gap)
+
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(account(session) for session in sessions))
+    finally:
+        for session in set(sessions):
+            await session.close()
+    return time.perf_counter() - start, latencies
+
+
+async def benchmark(accounts: int, bursts: int, requests: int, gap: float, runs: int) -> None:
+    """Compare per-account sessions with shared pools against a local server with a 2ms handler"""
+    # Client ports seen by the server, one per connection opened
+    ports: Set[int] = set()
+
+    async def handle(request: web.Request) -> web.Response:
+        peer = request.transport.get_extra_info("peername") if request.transport else None
+        if peer:
+            ports.add(peer[1])
+        await asyncio.sleep(0.002)
+        return web.Response(text="{}", content_type="application/json")
+
+    app = web.Application()
+    app.router.add_get("/", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    host, port = runner.addresses[0][:2]
+    url = f"http://{host}:{port}/"
+
+    def shared(pool: HttpPoolConfig) -> Callable[[], List[ClientSession]]:
+        return lambda: [create_session(pool)] * accounts
+
+    scenarios: Dict[str, Callable[[], List[ClientSession]]] = {
+        "per-account sessions": lambda: [create_session(HttpPoolConfig()) for _ in range(accounts)],
+        "shared, aiohttp defaults": shared(HttpPoolConfig()),
+        "shared, limit_per_host=10": shared(HttpPoolConfig(limit_per_host=10)),
+        f"shared, keepalive {gap / 2:g}s < gap": shared(HttpPoolConfig(keepalive_timeout=Duration(gap / 2))),
+        "shared, force_close": lambda: [ClientSession(connector=TCPConnector(force_close=True))] * accounts,
+    }
+    try:
+        for run in range(1, runs + 1):
+            print(f"Run {run} of {runs}: {accounts} accounts, {bursts} bursts of {requests} requests, {gap:g}s gaps")
+            for name, sessions in scenarios.items():
+                ports.clear()
+                elapsed, latencies = await run_scenario(url, sessions(), bursts, requests, gap)
+                percentiles = statistics.quantiles(latencies, n=100)
+                print(
+                    f"  {name:<30} {len(latencies) / elapsed:5.0f} req/s  p50 {percentiles[49] * 1e3:5.1f}ms"
+                    f"  p99 {percentiles[98] * 1e3:6.1f}ms  {len(ports):5} connections"
+                )
+    finally:
+        await runner.cleanup()
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--accounts", type=int, default=40, help="accounts sending requests at once")
+    parser.add_argument("--bursts", type=int, default=5, help="bursts per account")
+    parser.add_argument("--requests", type=int, default=25, help="sequential requests per burst")
+    parser.add_argument("--gap", type=float, default=0.2, help="idle seconds between bursts")
+    parser.add_argument("--runs", type=int, default=2, help="runs of every scenario, the first one warming up")
+    options = parser.parse_args(args)
+    asyncio.run(benchmark(options.accounts, options.bursts, options.requests, options.gap, options.runs))
+
+
+if __name__ == "__main__":
+    main()
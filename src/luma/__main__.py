@@ -1,4 +1,16 @@
-from luma.core import main
+import sys
+
+from luma.cli.fast import run_fast_path
+
+
+def main(args: "list[str] | None" = None) -> None:
+    """The CLI entry function, answering cheap queries without loading Luma"""
+    args = args or sys.argv[1:]
+    if not run_fast_path(args):
+        from luma.core import main as core_main
+
+        core_main(args)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,37 @@
+"""HTTP client service shared by the accounts of Ariadne"""
+
+from typing import TYPE_CHECKING
+
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+from graia.amnesia.builtins.aiohttp import AiohttpClientService
+from launart import Launart
+
+if TYPE_CHECKING:
+    from luma.bundled.components.graia_ariadne import HttpPoolConfig
+
+
+def create_session(pool: "HttpPoolConfig") -> ClientSession:
+    connector = TCPConnector(
+        limit=pool.limit,
+        limit_per_host=pool.limit_per_host,
+        keepalive_timeout=pool.keepalive_timeout,
+        use_dns_cache=pool.dns_cache,
+        ttl_dns_cache=pool.dns_cache_ttl,
+    )
+    return ClientSession(connector=connector, timeout=ClientTimeout(total=None))
+
+
+class PooledClientService(AiohttpClientService):
+    """The aiohttp client service of Ariadne, with a session created from the pool settings"""
+
+    def __init__(self, pool: "HttpPoolConfig") -> None:
+        super().__init__()
+        self.pool = pool
+
+    async def launch(self, mgr: Launart):
+        async with self.stage("preparing"):
+            # The connector needs the running loop
+            if not self.session:
+                self.session = create_session(self.pool)
+        async with self.stage("cleanup"):
+            await self.session.close()
@@ -1,26 +1,50 @@
 from dataclasses import dataclass
-from typing import Any, Dict, List, Union, cast
+from typing import Any, Dict, List, Optional, Union, cast
 
+from luma.convert import Duration, convert_kwargs
 from luma.core import Core
 from luma.exceptions import LumaConfigError
+from luma.supervisor import worker_shard
 from luma.utils import cp_field
 
 
 def initialize(core: Core):
     core.component_handlers["graia-ariadne"] = handler
+    core.component_requires["graia-ariadne"] = ("launart:graia.ariadne.service:ElizabethService",)
 
 
-called: bool = False
+@dataclass
+class HttpPoolConfig:
+    """HTTP connection pool shared by all the accounts"""
+
+    limit: int = 100
+    """Connections to all hosts, unlimited if 0"""
+    limit_per_host: int = 0
+    """Connections to a single host, unlimited if 0"""
+    keepalive_timeout: Duration = Duration(15.0)
+    """Seconds idle connections are kept open"""
+    dns_cache: bool = True
+    dns_cache_ttl: Optional[Duration] = Duration(10.0)
+    """Seconds resolved addresses are cached, forever if not set"""
+
+
+@dataclass
+class AriadneComponentConfig:
+    http: HttpPoolConfig = cp_field(HttpPoolConfig())
 
 
 def handler(core: Core, kwargs: Dict[str, Any]):
-    global called
-    if called:
-        raise LumaConfigError("Ariadne is specified multiple times.")
-    called = True
-    if kwargs["__sub__"]:
+    if kwargs.pop("__sub__"):
         raise LumaConfigError("Ariadne don't have sub-component!")
-    core.component_handlers["launart"](core, {"__sub__": "graia.ariadne.service:ElizabethService"})
+    config = AriadneComponentConfig(**convert_kwargs(AriadneComponentConfig, kwargs, "graia-ariadne component"))
+
+    def add_client_service(core: Core, runtime_ctx):
+        from luma.bundled.components.ariadne_http import PooledClientService
+
+        # Ariadne only adds its default client service if there is none
+        runtime_ctx["launart"].add_service(PooledClientService(config.http))
+
+    core.hooks.add_hook("pre_run", add_client_service)
     core.hooks.add_hook("pre_run", conf_ariadne, exclusive=True)
 
 
@@ -95,7 +119,13 @@ def conf_ariadne(core: Core, runtime_ctx):
     AriadneCredential = config("graia.ariadne.credential")(AriadneCredential)
 
     Ariadne.launch_manager = runtime_ctx["launart"]
-    for account in create(AriadneCredential).accounts:
+    accounts = create(AriadneCredential).accounts
+    if shard := worker_shard():
+        index, count = shard
+        accounts = accounts[index::count]
+        if not accounts:
+            core.ui.echo(f"[warning]No account for worker [req]{index}[/req] of {count}")
+    for account in accounts:
         from_obj(cast(Any, asdict(account, dict_factory=lambda t: {k: v for k, v in dict(t).items() if v is not None})))
         core.ui.echo(f"[info]Added account: [req]{account.account}[/req]")
     Ariadne._patch_launch_manager()
@@ -0,0 +1,142 @@
+import os
+import signal
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from luma.convert import ByteSize, Duration, convert_kwargs
+from luma.core import Core
+from luma.exceptions import LumaConfigError
+from luma.utils import rotating_logger
+
+OTHER = "<other>"
+
+
+def initialize(core: Core):
+    core.component_handlers["memory"] = handler
+
+
+@dataclass
+class MemoryConfig:
+    depth: int = 25
+    """Number of frames stored per allocation, deep enough to reach module code from library calls"""
+    interval: Optional[Duration] = None
+    """Seconds between two snapshots, only taken on signal if not set"""
+    signal: Optional[str] = "SIGUSR2"
+    """Signal taking a snapshot, if available on the platform"""
+    top: int = 20
+    """Number of top growing lines reported"""
+    log_file: str = "logs/memory.log"
+    """Relative to the project root"""
+    max_bytes: ByteSize = ByteSize(10 * 1024 * 1024)
+    backup_count: int = 3
+
+
+def handler(core: Core, kwargs: Dict[str, Any]):
+    if kwargs.pop("__sub__"):
+        raise LumaConfigError("Memory don't have sub-component!")
+    config = MemoryConfig(**convert_kwargs(MemoryConfig, kwargs, "memory component"))
+    if config.depth < 1 or (config.interval is not None and config.interval <= 0):
+        raise LumaConfigError("Memory depth and interval must be positive")
+    if config.signal and not config.signal.startswith("SIG"):
+        raise LumaConfigError(f"Invalid memory signal {config.signal!r}")
+
+    def start_tracking(core: Core, ctx: Dict[str, Any]):
+        from luma.discovery import module_sources
+        from luma.supervisor import worker_path
+
+        files: Dict[str, str] = {}
+        # Resolved by `luma run`; longer names come last, so the files of submodules go to them
+        for module in sorted(ctx.get("modules", ()), key=len):
+            try:
+                files.update(dict.fromkeys(module_sources(module), module))
+            except (ImportError, ValueError):
+                continue
+        log_file = worker_path(core.project_root / config.log_file)
+        MemoryTracker(config, log_file, files).start()
+        core.ui.echo(f"[info]Tracking memory allocations, logging to [req]{log_file}[/req]")
+
+    core.hooks.add_hook("pre_run", start_tracking)
+
+
+class MemoryTracker:
+    """Takes tracemalloc snapshots and reports the growth of allocations per Saya module.
+
+    Allocations are attributed to the innermost frame of their traceback in a module file.
+    Only the sizes per module and per line are kept between snapshots.
+    """
+
+    def __init__(self, config: MemoryConfig, log_file: Path, files: Dict[str, str]):
+        self.config = config
+        self.files = {os.path.normcase(os.path.abspath(file)): module for file, module in files.items()}
+        self.baseline: Optional[Tuple[Counter, Counter]] = None
+        self.previous: Optional[Tuple[Counter, Counter]] = None
+        self.lock = threading.Lock()
+        self._modules: Dict[str, Optional[str]] = {}
+        self.logger = rotating_logger("luma.memory", log_file, config.max_bytes, config.backup_count)
+
+    def start(self) -> None:
+        tracemalloc.start(self.config.depth)
+        self.baseline = self.previous = self.group(self.take())
+        self.logger.info("Tracking allocations with %d frames", self.config.depth)
+        if self.config.signal and (sig := getattr(signal, self.config.signal, None)) is not None:
+            # Grouping a snapshot takes a while, keep it out of the signal handler
+            signal.signal(sig, lambda *_: threading.Thread(target=self.report, name="luma-memory").start())
+        if self.config.interval is not None:
+            threading.Thread(target=self.watch, name="luma-memory", daemon=True).start()
+
+    def watch(self) -> None:
+        while True:
+            time.sleep(self.config.interval)  # type: ignore
+            self.report()
+
+    def take(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
+
+    def module(self, filename: str) -> Optional[str]:
+        if filename not in self._modules:
+            self._modules[filename] = self.files.get(os.path.normcase(os.path.abspath(filename)))
+        return self._modules[filename]
+
+    def group(self, snapshot: tracemalloc.Snapshot) -> Tuple[Counter, Counter]:
+        """Sizes per module and per module line"""
+        modules: Counter = Counter()
+        lines: Counter = Counter()
+        for trace in snapshot.traces:
+            # Frames go from the oldest to the most recent one
+            for frame in reversed(trace.traceback):
+                module = self.module(frame.filename)
+                if module is not None:
+                    modules[module] += trace.size
+                    lines[frame.filename, frame.lineno] += trace.size
+                    break
+            else:
+                modules[OTHER] += trace.size
+        return modules, lines
+
+    def report(self) -> None:
+        with self.lock:
+            modules, lines = self.group(self.take())
+            baseline_modules, _ = self.baseline  # type: ignore
+            previous_modules, previous_lines = self.previous  # type: ignore
+            self.previous = modules, lines
+        current, peak = tracemalloc.get_traced_memory()
+        report: List[str] = [f"Traced memory: {current / 1024:.1f} KiB, peak {peak / 1024:.1f} KiB"]
+        growth = {module: modules[module] - previous_modules[module] for module in {*modules, *previous_modules}}
+        for module in sorted(growth, key=growth.__getitem__, reverse=True):
+            report.append(
+                f"  {module}: {modules[module] / 1024:.1f} KiB, "
+                f"{growth[module] / 1024:+.1f} KiB since last, "
+                f"{(modules[module] - baseline_modules[module]) / 1024:+.1f} KiB since start"
+            )
+        line_growth = Counter(lines)
+        line_growth.subtract(previous_lines)
+        growers = [(location, size) for location, size in line_growth.most_common(self.config.top) if size > 0]
+        if growers:
+            report.append(f"Top {len(growers)} growing lines since last:")
+            report.extend(f"  {filename}:{lineno}: {size / 1024:+.1f} KiB" for (filename, lineno), size in growers)
+        self.logger.info("\n".join(report))
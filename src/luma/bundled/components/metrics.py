@@ -0,0 +1,18 @@
+from typing import Any, Dict
+
+from luma.content import Component
+from luma.core import Core
+from luma.exceptions import LumaConfigError
+
+SERVICE = "launart:luma.bundled.components.metrics_service:MetricsService"
+
+
+def initialize(core: Core):
+    core.component_handlers["metrics"] = handler
+    # The arguments of the component are the ones of the service
+    core.component_requires["metrics"] = lambda component: [Component(SERVICE, component.args)]
+
+
+def handler(core: Core, kwargs: Dict[str, Any]):
+    if kwargs.pop("__sub__"):
+        raise LumaConfigError("Metrics don't have sub-component!")
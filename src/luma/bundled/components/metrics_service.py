@@ -0,0 +1,304 @@
+"""Launart service exposing metrics of the running bot"""
+
+import asyncio
+import gc
+import os
+import sys
+import time
+from bisect import bisect_left
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+from launart import Launart, Launchable
+
+from luma.convert import Duration
+from luma.exceptions import LumaConfigError
+from luma.supervisor import worker_shard
+
+if TYPE_CHECKING:
+    from graia.broadcast import Broadcast
+
+DISPATCH_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LAG_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Pre-aggregated histogram, observing only increments a bucket"""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Sequence[float]) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in labels) + "}"
+
+
+class Exposition:
+    """Builder of the Prometheus text format"""
+
+    def __init__(self) -> None:
+        self.lines: List[str] = []
+
+    def family(self, name: str, kind: str, help: str) -> None:
+        self.lines.append(f"# HELP {name} {help}")
+        self.lines.append(f"# TYPE {name} {kind}")
+
+    def sample(self, name: str, value: float, labels: Labels = ()) -> None:
+        self.lines.append(f"{name}{format_labels(labels)} {value!r}")
+
+    def histogram(self, name: str, histogram: Histogram, labels: Labels = ()) -> None:
+        cumulative = 0
+        for bound, count in zip(histogram.bounds, histogram.counts):
+            cumulative += count
+            self.sample(f"{name}_bucket", cumulative, (*labels, ("le", repr(bound))))
+        self.sample(f"{name}_bucket", histogram.count, (*labels, ("le", "+Inf")))
+        self.sample(f"{name}_sum", histogram.sum, labels)
+        self.sample(f"{name}_count", histogram.count, labels)
+
+    def render(self) -> bytes:
+        return ("\n".join(self.lines) + "\n").encode("utf-8")
+
+
+def resident_memory() -> Optional[int]:
+    """Current resident set size, only available on Linux"""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class ChannelStats:
+    __slots__ = ("latency", "errors")
+
+    def __init__(self) -> None:
+        self.latency = Histogram(DISPATCH_BUCKETS)
+        self.errors = 0
+
+
+class MetricsService(Launchable):
+    """Serves metrics in the Prometheus text format over HTTP, on a TCP port or a Unix socket.
+
+    Dispatches are measured by wrapping `Broadcast.Executor` for listeners,
+    and aggregated into histograms per Saya channel when they finish.
+
+    Under `luma run --workers` or `--fork-server`, every worker serves its own metrics:
+    worker `i` listens on `port + i`, or on `unix_socket.i`, so that they don't compete for the address.
+    """
+
+    id = "luma.metrics"
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 9464,
+        unix_socket: Optional[str] = None,
+        lag_interval: Duration = Duration(1.0),
+    ) -> None:
+        super().__init__()
+        self.host = host
+        self.port = port
+        self.unix_socket = unix_socket
+        self.lag_interval = lag_interval
+        self.channels: Dict[str, ChannelStats] = {}
+        self.lag = Histogram(LAG_BUCKETS)
+        self.routes: Dict[str, Callable[[], Awaitable[Tuple[str, bytes]]]] = {
+            "/metrics": self.metrics,
+            "/profile/start": self.start_profile,
+            "/profile/stop": self.stop_profile,
+        }
+        self._broadcast: Optional["Broadcast"] = None
+        self._lag_handle: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def required(self) -> Set[str]:
+        return set()
+
+    @property
+    def stages(self) -> Set[str]:
+        return {"preparing", "blocking", "cleanup"}
+
+    def instrument(self, broadcast: "Broadcast") -> None:
+        from graia.broadcast.entities.listener import Listener
+        from graia.broadcast.exceptions import ExecutionStop, PropagationCancelled
+
+        executor = broadcast.Executor
+        channels = self.channels
+        perf_counter = time.perf_counter
+
+        async def Executor(target, *args, **kwargs):
+            if target.__class__ is not Listener or kwargs.get("depth"):
+                return await executor(target, *args, **kwargs)
+            start = perf_counter()
+            failed = False
+            try:
+                return await executor(target, *args, **kwargs)
+            except (ExecutionStop, PropagationCancelled):
+                raise
+            except Exception:
+                failed = True
+                raise
+            finally:
+                channel = getattr(target.callable, "__module__", None) or "unknown"
+                stats = channels.get(channel)
+                if stats is None:
+                    stats = channels[channel] = ChannelStats()
+                stats.latency.observe(perf_counter() - start)
+                stats.errors += failed
+
+        broadcast.Executor = Executor  # type: ignore
+        self._broadcast = broadcast
+
+    def uninstrument(self) -> None:
+        if self._broadcast is not None:
+            del self._broadcast.Executor
+            self._broadcast = None
+
+    def heartbeat(self, loop: asyncio.AbstractEventLoop, expected: float) -> None:
+        now = loop.time()
+        self.lag.observe(max(now - expected, 0.0))
+        self._lag_handle = loop.call_at(now + self.lag_interval, self.heartbeat, loop, now + self.lag_interval)
+
+    def collect_accounts(self, exposition: Exposition) -> None:
+        if self.manager is None:
+            return
+        exposition.family("luma_launchable_stage", "gauge", "Stage of Launart launchables")
+        for launchable in self.manager.launchables.values():
+            labels = (("id", launchable.id), ("stage", str(launchable.status.stage)))
+            exposition.sample("luma_launchable_stage", 1, labels)
+        connections: List[Tuple[str, Any]] = []
+        for launchable in self.manager.launchables.values():
+            if isinstance(getattr(launchable, "connections", None), dict):
+                connections.extend((str(account), connection) for account, connection in launchable.connections.items())
+        for state in ("connected", "alive", "available"):
+            exposition.family(f"luma_account_{state}", "gauge", f"Whether the connection of the account is {state}")
+            for account, connection in connections:
+                value = getattr(connection.status, state, False)
+                exposition.sample(f"luma_account_{state}", int(bool(value)), (("account", account),))
+
+    def collect(self) -> Exposition:
+        exposition = Exposition()
+        exposition.family("luma_dispatch_seconds", "histogram", "Time spent running event listeners by Saya channel")
+        for channel, stats in sorted(self.channels.items()):
+            exposition.histogram("luma_dispatch_seconds", stats.latency, (("channel", channel),))
+        exposition.family("luma_dispatch_errors_total", "counter", "Event listeners raising an exception")
+        for channel, stats in sorted(self.channels.items()):
+            exposition.sample("luma_dispatch_errors_total", stats.errors, (("channel", channel),))
+        exposition.family("luma_event_loop_lag_seconds", "histogram", "Delay of callbacks scheduled on the loop")
+        exposition.histogram("luma_event_loop_lag_seconds", self.lag)
+        exposition.family("luma_event_loop_tasks", "gauge", "Tasks not done on the event loop")
+        exposition.sample("luma_event_loop_tasks", len(asyncio.all_tasks()))
+        if (rss := resident_memory()) is not None:
+            exposition.family("process_resident_memory_bytes", "gauge", "Resident memory size in bytes")
+            exposition.sample("process_resident_memory_bytes", rss)
+        exposition.family("python_gc_collections_total", "counter", "Collections of each generation")
+        exposition.family("python_gc_objects_collected_total", "counter", "Objects collected in each generation")
+        exposition.family("python_gc_objects_uncollectable_total", "counter", "Uncollectable objects found")
+        for generation, stats in enumerate(gc.get_stats()):
+            labels = (("generation", str(generation)),)
+            exposition.sample("python_gc_collections_total", stats["collections"], labels)
+            exposition.sample("python_gc_objects_collected_total", stats["collected"], labels)
+            exposition.sample("python_gc_objects_uncollectable_total", stats["uncollectable"], labels)
+        exposition.family(
+            "python_gc_objects_tracked", "gauge", "Objects tracked since the last collection of each generation"
+        )
+        for generation, count in enumerate(gc.get_count()):
+            exposition.sample("python_gc_objects_tracked", count, (("generation", str(generation)),))
+        self.collect_accounts(exposition)
+        return exposition
+
+    async def metrics(self) -> Tuple[str, bytes]:
+        return "text/plain; version=0.0.4; charset=utf-8", self.collect().render()
+
+    async def start_profile(self) -> Tuple[str, bytes]:
+        from luma import sampler
+
+        profiler = sampler.current()
+        if profiler is None:
+            return "text/plain", b"Sampling profiler not installed\n"
+        return "text/plain", b"Started\n" if profiler.start() else b"Already running\n"
+
+    async def stop_profile(self) -> Tuple[str, bytes]:
+        from luma import sampler
+
+        profiler = sampler.current()
+        if profiler is None:
+            return "text/plain", b"Sampling profiler not installed\n"
+        # Joining the sampling thread and writing the stacks may take a while
+        path = await asyncio.get_running_loop().run_in_executor(None, profiler.stop)
+        return "text/plain", f"{path}\n".encode() if path else b"Not running\n"
+
+    async def serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request = await reader.readuntil(b"\r\n\r\n")
+            method, path, *_ = request.split(b"\r\n", 1)[0].decode("latin-1").split(" ")
+            route = self.routes.get(path.partition("?")[0])
+            if method != "GET" or route is None:
+                status, content_type, body = "404 Not Found", "text/plain", b"Not Found\n"
+            else:
+                status = "200 OK"
+                content_type, body = await route()
+            head = f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+            writer.write(f"{head}Connection: close\r\n\r\n".encode("latin-1") + body)
+            await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def launch(self, manager: Launart):
+        import creart
+        from graia.broadcast import Broadcast
+
+        async with self.stage("preparing"):
+            self.instrument(creart.it(Broadcast))
+            loop = asyncio.get_running_loop()
+            self.heartbeat(loop, loop.time())
+            # Forked workers share the instance created before forking, so the worker is only known now
+            port, unix_socket = self.port, self.unix_socket
+            if shard := worker_shard():
+                port += shard[0]
+                unix_socket = unix_socket and f"{unix_socket}.{shard[0]}"
+            if unix_socket:
+                if sys.platform == "win32":
+                    raise LumaConfigError("Unix sockets are not supported on Windows")
+                server = await asyncio.start_unix_server(self.serve, unix_socket)
+            else:
+                server = await asyncio.start_server(self.serve, self.host, port)
+
+        async with self.stage("blocking"):
+            await manager.status.wait_for_sigexit()
+
+        async with self.stage("cleanup"):
+            server.close()
+            await server.wait_closed()
+            if self._lag_handle is not None:
+                self._lag_handle.cancel()
+            self.uninstrument()
@@ -0,0 +1,146 @@
+import sys
+import threading
+import time
+from asyncio import AbstractEventLoop
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from types import FrameType
+from typing import Any, Deque, Dict, Iterable, List, Optional
+
+from luma.convert import ByteSize, Duration, convert_kwargs
+from luma.core import Core
+from luma.exceptions import LumaConfigError
+from luma.utils import rotating_logger
+
+
+def initialize(core: Core):
+    core.component_handlers["watchdog"] = handler
+
+
+@dataclass
+class WatchdogConfig:
+    interval: Duration = Duration(0.1)
+    """Seconds between two heartbeats of the loop"""
+    threshold: Duration = Duration(1.0)
+    """Seconds without heartbeat after which the loop is considered blocked"""
+    log_file: str = "logs/watchdog.log"
+    """Relative to the project root"""
+    max_bytes: ByteSize = ByteSize(10 * 1024 * 1024)
+    backup_count: int = 3
+    stats_interval: Duration = Duration(60.0)
+    """Seconds between two lag statistics records"""
+    samples: int = 10000
+    """Number of the latest lags the statistics are computed on"""
+
+
+def handler(core: Core, kwargs: Dict[str, Any]):
+    if kwargs.pop("__sub__"):
+        raise LumaConfigError("Watchdog don't have sub-component!")
+    config = WatchdogConfig(**convert_kwargs(WatchdogConfig, kwargs, "watchdog component"))
+    if config.interval <= 0 or config.threshold <= config.interval:
+        raise LumaConfigError("Watchdog threshold must be greater than its interval, which must be positive")
+
+    def start_watchdog(core: Core, ctx: Dict[str, Any]):
+        import creart
+
+        from luma.supervisor import worker_path
+
+        saya = ctx.get("saya")
+        modules = list(saya.channels) if saya is not None else []
+        log_file = worker_path(core.project_root / config.log_file)
+        LoopWatchdog(creart.it(AbstractEventLoop), config, log_file, modules).start()
+        core.ui.echo(f"[info]Watching event loop lag, logging to [req]{log_file}[/req]")
+
+    core.hooks.add_hook("pre_run", start_watchdog)
+
+
+def responsible_module(frame: Optional[FrameType], modules: Iterable[str]) -> Optional[str]:
+    """Name of the innermost module of the stack that is one of modules, or the innermost module otherwise"""
+    prefixes = tuple(modules)
+    innermost: Optional[str] = None
+    while frame is not None:
+        name = frame.f_globals.get("__name__")
+        if isinstance(name, str):
+            innermost = innermost or name
+            if prefixes and any(name == module or name.startswith(f"{module}.") for module in prefixes):
+                return name
+        frame = frame.f_back
+    return innermost
+
+
+class LoopWatchdog:
+    """Detects the event loop being blocked, with a heartbeat scheduled on it and a thread watching it"""
+
+    def __init__(self, loop: AbstractEventLoop, config: WatchdogConfig, log_file: Path, modules: List[str]):
+        self.loop = loop
+        self.config = config
+        self.modules = modules
+        self.lags: Deque[float] = deque(maxlen=config.samples)
+        self.loop_thread: Optional[int] = None
+        self.last_beat: Optional[float] = None
+        self.expected_beat: float = 0.0
+        self.logger = rotating_logger("luma.watchdog", log_file, config.max_bytes, config.backup_count)
+
+    def start(self) -> None:
+        # Runs once the loop is running
+        self.loop.call_soon_threadsafe(self.beat)
+        threading.Thread(target=self.watch, name="luma-watchdog", daemon=True).start()
+
+    def beat(self) -> None:
+        now = time.perf_counter()
+        if self.last_beat is None:
+            self.loop_thread = threading.get_ident()
+        else:
+            self.lags.append(max(now - self.expected_beat, 0.0))
+        self.last_beat = now
+        self.expected_beat = now + self.config.interval
+        self.loop.call_later(self.config.interval, self.beat)
+
+    def watch(self) -> None:
+        stalled_beat: Optional[float] = None
+        next_stats = time.perf_counter() + self.config.stats_interval
+        while not self.loop.is_closed():
+            time.sleep(self.config.interval)
+            now = time.perf_counter()
+            if self.last_beat is None or self.loop_thread is None:
+                continue
+            blocked = now - self.last_beat
+            if blocked >= self.config.threshold and stalled_beat != self.last_beat:
+                # Report once per stall
+                stalled_beat = self.last_beat
+                self.report_stall(blocked)
+            elif stalled_beat is not None and stalled_beat != self.last_beat:
+                self.logger.warning("Event loop recovered after %.3fs", self.last_beat - stalled_beat)
+                stalled_beat = None
+            if now >= next_stats:
+                next_stats = now + self.config.stats_interval
+                self.report_stats()
+
+    def report_stall(self, blocked: float) -> None:
+        import traceback
+
+        frame = sys._current_frames().get(self.loop_thread)  # type: ignore
+        stack = "".join(traceback.format_stack(frame)) if frame is not None else "<unavailable>\n"
+        self.logger.warning(
+            "Event loop blocked for %.3fs in module %s\n%s",
+            blocked,
+            responsible_module(frame, self.modules),
+            stack.rstrip(),
+        )
+
+    def report_stats(self) -> None:
+        import statistics
+
+        lags = sorted(self.lags)
+        if len(lags) < 2:
+            return
+        percentiles = statistics.quantiles(lags, n=100, method="inclusive")
+        self.logger.info(
+            "Event loop lag over %d beats: p50 %.2fms, p90 %.2fms, p99 %.2fms, max %.2fms",
+            len(lags),
+            percentiles[49] * 1e3,
+            percentiles[89] * 1e3,
+            percentiles[98] * 1e3,
+            lags[-1] * 1e3,
+        )
@@ -0,0 +1,153 @@
+"""On-disk caches"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+import sys
+from contextlib import suppress
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    import importlib_metadata as pkg_meta
+
+ENTRY_POINT_PREFIX = "luma."
+
+
+def user_cache_dir() -> Path:
+    """Per-user cache directory (env var: LUMA_CACHE_DIR)"""
+    if cache_dir := os.getenv("LUMA_CACHE_DIR"):
+        return Path(cache_dir)
+    if sys.platform == "win32":
+        return Path(os.getenv("LOCALAPPDATA") or Path.home() / "AppData" / "Local", "luma", "Cache")
+    return Path(os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache", "luma")
+
+
+def project_cache_dir(project_root: Path) -> Path:
+    """Cache directory living inside the bot project"""
+    return project_root / ".luma"
+
+
+def digest(*parts: str | bytes) -> str:
+    hasher = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        hasher.update(part if isinstance(part, bytes) else part.encode("utf-8", "surrogateescape"))
+        hasher.update(b"\0")
+    return hasher.hexdigest()
+
+
+def load_cache(path: Path, key: str) -> Any:
+    """Load data stored by `dump_cache`.
+
+    :return: the cached data, or None if the cache is missing, stale or corrupted.
+    """
+    try:
+        with open(path, "rb") as fp:
+            cached_key, data = pickle.load(fp)
+    except Exception:
+        return None
+    return data if cached_key == key else None
+
+
+def dump_cache(path: Path, key: str, data: Any) -> None:
+    """Atomically store data with its cache key, ignoring unwritable locations."""
+    with suppress(OSError, pickle.PicklingError):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        ignore_file = path.parent / ".gitignore"
+        if not ignore_file.exists():
+            ignore_file.write_text("*\n", encoding="utf-8")
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp_path, "wb") as fp:
+                pickle.dump((key, data), fp, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        finally:
+            with suppress(OSError):
+                os.unlink(tmp_path)
+
+
+def interpreter_tag() -> str:
+    """Tag telling apart caches of different interpreters and import paths"""
+    return digest(sys.executable, *sys.path)[:12]
+
+
+def distributions_fingerprint() -> str:
+    """Fingerprint of `sys.path` and the names and mtimes of the distributions' metadata and `.pth` files.
+
+    The directories themselves are left out, as unrelated files in them (like the project root) change often.
+    """
+    parts: list[str] = []
+    for entry in sys.path:
+        parts.append(entry)
+        try:
+            with os.scandir(entry or ".") as it:
+                parts.extend(
+                    sorted(
+                        f"{item.name}:{item.stat().st_mtime_ns}"
+                        for item in it
+                        if item.name.endswith((".dist-info", ".egg-info", ".pth"))
+                    )
+                )
+        except OSError:
+            continue
+    return digest(*parts)
+
+
+class EntryPointIndex:
+    """Index of all `luma.*` entry point groups and the installed distributions' versions.
+
+    The index is persisted under the user cache directory and rebuilt
+    when `sys.path` or any distribution's metadata directory changes.
+    """
+
+    _instance: EntryPointIndex | None = None
+
+    def __init__(self, key: str, groups: dict[str, list[tuple[str, str]]], versions: dict[str, str]) -> None:
+        self.key: str = key
+        self.groups: dict[str, list[tuple[str, str]]] = groups
+        self.versions: dict[str, str] = versions
+
+    @staticmethod
+    def cache_path() -> Path:
+        return user_cache_dir() / f"entry-points-{interpreter_tag()}.pickle"
+
+    @classmethod
+    def build(cls, key: str) -> EntryPointIndex:
+        import importlib_metadata as pkg_meta
+
+        groups: dict[str, list[tuple[str, str]]] = {}
+        versions: dict[str, str] = {}
+        for dist in pkg_meta.distributions():
+            name: str = dist.metadata["Name"]
+            if name in versions:  # Shadowed by an earlier `sys.path` entry
+                continue
+            versions[name] = dist.version
+            for ep in dist.entry_points:
+                if not ep.group.startswith(ENTRY_POINT_PREFIX):
+                    continue
+                groups.setdefault(ep.group, []).append((ep.name, ep.value))
+        return cls(key, groups, versions)
+
+    @classmethod
+    def load(cls) -> EntryPointIndex:
+        """Get the index, rebuilding the on-disk copy if it is stale"""
+        if cls._instance is None:
+            key = distributions_fingerprint()
+            cached = load_cache(cls.cache_path(), key)
+            if cached is None:
+                index = cls.build(key)
+                dump_cache(cls.cache_path(), key, (index.groups, index.versions))
+            else:
+                index = cls(key, *cached)
+            cls._instance = index
+        return cls._instance
+
+    def select(self, group: str) -> list[pkg_meta.EntryPoint]:
+        import importlib_metadata as pkg_meta
+
+        return [pkg_meta.EntryPoint(name, value, group) for name, value in self.groups.get(group, [])]
+
+    def version(self, dist_name: str) -> str | None:
+        return self.versions.get(dist_name)
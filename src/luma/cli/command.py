@@ -5,6 +5,7 @@ import argparse
 
 import luma.core
 from luma.cli.utils import LumaFormatter, Option
+from luma.profiling import IMPORTS_OPTION, JSON_OPTION, PROFILE_OPTION
 
 verbose_option = Option(
     "-v",
@@ -22,6 +23,12 @@ bot_path_option = Option(
 
 python_option = Option("-py", "--python-path", help="Specify Python path")
 
+profile_options = [
+    Option(PROFILE_OPTION, action="store_true", help="Report the time spent on each startup phase"),
+    Option(IMPORTS_OPTION, action="store_true", help="Report startup import times, implies --profile-startup"),
+    Option(JSON_OPTION, metavar="FILE", help="Write the startup profile as JSON, implies --profile-startup"),
+]
+
 
 class Command(abc.ABC):
     """A CLI subcommand"""
@@ -32,7 +39,7 @@ class Command(abc.ABC):
     description: str | None = None
     # A list of pre-defined options which will be loaded on initializing
     # Rewrite this if you don't want the default ones
-    arguments: list[Option] = [verbose_option]
+    arguments: list[Option] = [verbose_option, *profile_options]
 
     def __init__(self, parser: argparse.ArgumentParser) -> None:
         for arg in self.arguments:
@@ -0,0 +1,68 @@
+"""Answer cheap queries from pre-rendered output.
+
+This module is imported before anything else of Luma,
+so it must not import rich, jsonschema or any plugin.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import sys
+from pathlib import Path
+from typing import Sequence
+
+from luma.cache import (
+    EntryPointIndex,
+    digest,
+    dump_cache,
+    interpreter_tag,
+    load_cache,
+    user_cache_dir,
+)
+
+QUERIES = {
+    "-h": "help",
+    "--help": "help",
+    "-V": "version",
+    "--version": "version",
+}
+# Environment variables affecting how rich and argparse render output
+RENDER_ENV_VARS = ("TERM", "COLORTERM", "NO_COLOR", "FORCE_COLOR", "TTY_COMPATIBLE", "COLUMNS", "LINES")
+
+
+def query_of(args: Sequence[str]) -> str | None:
+    """Get the query name if args only ask for top-level help or the version"""
+    return QUERIES.get(args[0]) if len(args) == 1 else None
+
+
+def rendered_cache() -> tuple[Path, str]:
+    """Path and key of the pre-rendered output, which depends on the installed plugins and the terminal"""
+    columns, lines = shutil.get_terminal_size()
+    key = digest(
+        EntryPointIndex.load().key,
+        str(sys.stdout.isatty()),
+        f"{columns}x{lines}",
+        *(os.getenv(var, "") for var in RENDER_ENV_VARS),
+    )
+    return user_cache_dir() / f"rendered-{interpreter_tag()}.pickle", key
+
+
+def store_rendered(rendered: dict[str, str]) -> None:
+    dump_cache(*rendered_cache(), rendered)
+
+
+def run_fast_path(args: Sequence[str]) -> bool:
+    """Print the pre-rendered answer of a query.
+
+    :return: whether the query is answered, the full CLI should run otherwise.
+    """
+    query = query_of(args)
+    if query is None:
+        return False
+    rendered: dict[str, str] | None = load_cache(*rendered_cache())
+    if not rendered or query not in rendered:
+        return False
+    sys.stdout.write(rendered[query])
+    sys.stdout.flush()
+    return True
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import os
+import py_compile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import suppress
+from pathlib import Path
+from typing import Iterable
+
+from luma.cli.command import Command
+from luma.commands.utils import require_content
+from luma.content import LumaConfig
+from luma.core import Core
+from luma.discovery import module_sources, resolve_modules
+from luma.exceptions import LumaUsageError
+from luma.term import UI
+
+
+def plugin(core: Core):
+    core.register_command(CompileCommand)
+
+
+def compile_source(path: str, unchecked_hash: bool = False) -> tuple[str, float, str | None]:
+    """Compile a source file to bytecode, returning the path, elapsed seconds and the error if any"""
+    mode = py_compile.PycInvalidationMode.UNCHECKED_HASH if unchecked_hash else None
+    start = time.perf_counter()
+    error: str | None = None
+    try:
+        py_compile.compile(path, doraise=True, invalidation_mode=mode)
+    except (py_compile.PyCompileError, OSError) as e:
+        error = str(e).strip()
+    return path, time.perf_counter() - start, error
+
+
+def bytecode_writable(path: str) -> bool:
+    """Whether the bytecode of a source file can be written, creating its cache directory if needed"""
+    directory = os.path.dirname(importlib.util.cache_from_source(path))
+    while not os.path.isdir(directory):
+        if (parent := os.path.dirname(directory)) == directory:
+            return False
+        directory = parent
+    return os.access(directory, os.W_OK)
+
+
+def collect_sources(modules: Iterable[str], ui: UI) -> list[str]:
+    """Find the source files of modules, including every file in packages"""
+    sources: dict[str, None] = {}
+    for name in modules:
+        try:
+            sources.update(dict.fromkeys(module_sources(name)))
+        except (ImportError, ValueError) as e:
+            ui.echo(f"[warning]Unable to find module [info]{name}[/info]: {e!r}", err=True)
+    return list(sources)
+
+
+class CompileCommand(Command):
+    """Precompile bot modules to bytecode."""
+
+    name = "compile"
+
+    def add_arguments(self, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument("-j", "--jobs", type=int, default=None, help="Number of processes, defaults to CPU count")
+        parser.add_argument(
+            "--unchecked-hash",
+            action="store_true",
+            help="Write unchecked hash-based pycs, which are never validated against the sources",
+        )
+
+    @require_content
+    def handle(self, core: Core, config: LumaConfig, options: argparse.Namespace) -> None:
+        modules = resolve_modules(config, core.ui, core.project_root)
+        modules.extend(hook.endpoint.partition(":")[0] for hook in config.hooks)
+        for component in config.components:
+            if sub := component.endpoint.partition(":")[2]:
+                modules.append(sub.partition(":")[0])
+        sources = collect_sources(dict.fromkeys(modules), core.ui)
+        # Components installed in read-only environments are left as they are
+        skipped = {path for path in sources if not bytecode_writable(path)}
+        if skipped:
+            core.ui.echo(f"[warning]Skipping {len(skipped)} file(s) whose bytecode can't be written", err=True)
+            for path in sorted(skipped):
+                core.ui.echo(f"  {path}", err=True, verbosity=1)
+            sources = [path for path in sources if path not in skipped]
+        if not sources:
+            core.ui.echo("[warning]No source file to compile")
+            return
+
+        start = time.perf_counter()
+        jobs = options.jobs or os.cpu_count() or 1
+        unchecked = [options.unchecked_hash] * len(sources)
+        if jobs == 1:
+            results = list(map(compile_source, sources, unchecked))
+        else:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                chunk_size = max(1, len(sources) // (jobs * 4))
+                results = list(executor.map(compile_source, sources, unchecked, chunksize=chunk_size))
+        elapsed = time.perf_counter() - start
+
+        results.sort(key=lambda result: result[1], reverse=True)
+        root = core.project_root.absolute()
+        rows = []
+        for path, duration, error in results:
+            with suppress(ValueError):
+                path = str(Path(path).relative_to(root))
+            rows.append([path, f"{duration * 1e3:.2f}", "[error]failed" if error else "[success]ok"])
+        core.ui.display_columns(rows, ["File", ">Time (ms)", "^Status"])
+        failed = [error for _, _, error in results if error]
+        for error in failed:
+            core.ui.echo(f"[error]{error}", err=True)
+        core.ui.echo(
+            f"Compiled [req]{len(results) - len(failed)}[/req] file(s) in {elapsed:.2f}s with {jobs} process(es)"
+        )
+        if failed:
+            raise LumaUsageError(f"{len(failed)} file(s) failed to compile")
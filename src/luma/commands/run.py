@@ -2,18 +2,31 @@ from __future__ import annotations
 
 import argparse
 import importlib
-import importlib.util
-import pkgutil
-from contextlib import contextmanager, suppress
+import os
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
 from typing import Any
 
+from luma import sampler
+from luma.cache import project_cache_dir
 from luma.cli.command import Command
 from luma.commands.utils import require_content
-from luma.content import LumaConfig, SingleModule
+from luma.content import LumaConfig
 from luma.core import Core
-from luma.exceptions import LumaConfigError
+from luma.discovery import module_sources, resolve_modules
+from luma.exceptions import LumaConfigError, LumaUsageError
+from luma.hook import HookTarget, LazyEndpoint
+from luma.loop import install_loop
+from luma.preload import Preloader
+from luma.profiling import ImportReport
+from luma.supervisor import ForkSupervisor, SubprocessSupervisor, worker_shard
 from luma.term import UI
 
+# Imported by the runner before Saya modules
+RUNTIME_MODULES = ("creart", "graia.saya", "kayaku", "kayaku.pretty")
+
 
 def plugin(core: Core):
     core.register_command(RunCommand)
@@ -32,28 +45,44 @@ class RunCommand(Command):
     name = "run"
     description = "Run your bot."
 
+    def add_arguments(self, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument(
+            "--import-report",
+            nargs="?",
+            const="",
+            metavar="PATH",
+            help="Report the time and memory spent importing each module, "
+            "and write it as JSON to PATH (defaults to .luma/import-report.json)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            metavar="N",
+            help="Split the accounts across N supervised worker processes",
+        )
+        parser.add_argument(
+            "--fork-server",
+            action="store_true",
+            help="Fork the workers from a process with dependencies imported, restart them on SIGHUP (POSIX only)",
+        )
+        parser.add_argument(
+            "--reload",
+            action="store_true",
+            help="Reload changed modules while running, and restart when luma.toml or hooks change",
+        )
+
     @require_content
     def handle(self, core: Core, config: LumaConfig, options: argparse.Namespace) -> None:
-        require_modules = []
-        for mod in config.modules:
-            if isinstance(mod, SingleModule):
-                require_modules.append(mod.endpoint)
-                core.ui.echo(f"Adding module [info]{mod.endpoint}[/info]", verbosity=2)
-            else:
-                iter_pth = [mod.endpoint]
-                with suppress(ImportError):
-                    iter_pth = list(importlib.import_module(mod.endpoint).__path__)
-                for mod_info in pkgutil.iter_modules(iter_pth):
-                    if mod_info.name in mod.exclude:
-                        continue
-                    candidate_name = f"{mod.endpoint}.{mod_info.name}"
-                    if importlib.util.find_spec(candidate_name) is None:
-                        core.ui.echo(f"[warning]{candidate_name} is invalid module, skipping")
-                        continue
-                    require_modules.append(candidate_name)
-                    core.ui.echo(f"Adding module [info]{candidate_name}[/info]")
+        supervise = worker_shard() is None and (options.workers > 1 or options.fork_server)
+        if supervise and not options.fork_server:
+            argv = core.luma_argv(sys.executable, sys.argv[1:])
+            raise SystemExit(SubprocessSupervisor(core.ui, options.workers, argv).run())
+        if supervise and not hasattr(os, "fork"):
+            raise LumaUsageError("--fork-server is only supported on POSIX")
 
-        runtime_ctx: dict[str, Any] = {}
+        with core.profiler.phase("resolve modules"):
+            require_modules = resolve_modules(config, core.ui, core.project_root)
 
         # Set up runner core
         run_hook_target = core.hooks.targets.get("run")
@@ -64,34 +93,131 @@ class RunCommand(Command):
             msg = f"Found {len(run_hook_target.core)} running target(s) instead of 1!"
             raise LumaConfigError(msg)
 
+        if supervise:
+            with core.profiler.phase("warm up zygote"):
+                self.warm_up(core, config, require_modules)
+            core.profiler.report(core.ui)
+            supervisor = ForkSupervisor(
+                core.ui, options.workers, lambda: self.start(core, config, options, require_modules, run_hook_target)
+            )
+            raise SystemExit(supervisor.run())
+        self.start(core, config, options, require_modules, run_hook_target)
+
+    def warm_up(self, core: Core, config: LumaConfig, require_modules: list[str]) -> None:
+        """Import the runtime and the dependencies of the modules, so forked workers share them"""
+        for name in RUNTIME_MODULES:
+            importlib.import_module(name)
+        for target in ("run_config", "run"):
+            if hook_target := core.hooks.targets.get(target):
+                for entry in (*hook_target.pre, *hook_target.core):
+                    if isinstance(entry.func, LazyEndpoint):
+                        # Import the hook modules in the zygote, so that workers share them
+                        entry.func.resolve()
+        cache_path = project_cache_dir(core.project_root) / "preload.pickle"
+        preloader = Preloader(config.run.preload, core.ui, core.project_root, cache_path)
+        preloader.dependencies = preloader.find_dependencies(require_modules)
+        if preloader.dependencies:
+            preloader.preload()
+        preloader.save()
+
+    def start(
+        self,
+        core: Core,
+        config: LumaConfig,
+        options: argparse.Namespace,
+        require_modules: list[str],
+        run_hook_target: HookTarget,
+    ) -> None:
+        """Run the hooks and import the modules, then block in the run hook"""
+        runtime_ctx: dict[str, Any] = {}
+
+        # Install the event loop before anything could capture creart's default one
+        with core.profiler.phase("install event loop"):
+            install_loop(config.run.loop)
+
         # Run configuration hooks
         if config_target := core.hooks.targets.get("run_config"):
             config_target.warn_hooks(core.ui, pre=True, post=True)
-            for hook_fn in config_target.core:
-                hook_fn(core, runtime_ctx)
+            with core.profiler.phase("run_config hooks"):
+                config_target.invoke("core", core, runtime_ctx)
 
         # Kayaku startup
-        import kayaku
-        import kayaku.pretty
+        with core.profiler.phase("initialize kayaku"):
+            import kayaku
+            import kayaku.pretty
 
-        kayaku.initialize(config.config.endpoints, kayaku.pretty.Prettifier(**config.config.format))
+            kayaku.initialize(config.config.endpoints, kayaku.pretty.Prettifier(**config.config.format))
 
         # Import Saya modules
-        import creart
-        from graia.saya import Saya
-
-        saya: Saya = runtime_ctx.get("saya") or creart.it(Saya)
-        runtime_ctx["saya"] = saya
-        with saya.module_context():
-            for mod in require_modules:
-                saya.require(mod)
+        with core.profiler.phase("import saya modules"):
+            import creart
+            from graia.saya import Saya
+
+            saya: Saya = runtime_ctx.get("saya") or creart.it(Saya)
+            runtime_ctx["saya"] = saya
+            runtime_ctx["modules"] = require_modules
+            import_report: ImportReport | None = None
+            if options.import_report is not None:
+                output = Path(options.import_report or project_cache_dir(core.project_root) / "import-report.json")
+                import_report = ImportReport(output)
+                import_report.start()
+            preloader: Preloader | None = None
+            # Preloading would hide the cost of dependencies from the import report unless asked for
+            if config.run.preload.enabled is True or (config.run.preload.enabled and import_report is None):
+                cache_path = project_cache_dir(core.project_root) / "preload.pickle"
+                preloader = Preloader(config.run.preload, core.ui, core.project_root, cache_path)
+            start = time.perf_counter()
+            if preloader:
+                with core.profiler.phase("preload dependencies"):
+                    if preloader.plan(require_modules):
+                        preloader.preload()
+            try:
+                with saya.module_context():
+                    for mod in require_modules:
+                        with import_report.measure(mod) if import_report else nullcontext():
+                            saya.require(mod)
+                if preloader and import_report is None:
+                    preloader.record(time.perf_counter() - start)
+            finally:
+                if import_report:
+                    import_report.report(core.ui)
+                if preloader:
+                    preloader.save()
 
         # Invoke run hook
         run_hook_target.warn_hooks(core.ui, post=True)
-        for pre_fn in run_hook_target.pre:
-            pre_fn(core, runtime_ctx)
+        with core.profiler.phase("pre_run hooks"):
+            run_hook_target.invoke("pre", core, runtime_ctx)
 
         # Kayaku bootstrap
-        kayaku.bootstrap()
+        with core.profiler.phase("bootstrap kayaku"):
+            kayaku.bootstrap()
 
-        run_hook_target.core[0](core, runtime_ctx)
+        if options.reload:
+            with core.profiler.phase("start reloader"):
+                from asyncio import AbstractEventLoop
+
+                from luma.reload import Reloader
+
+                restart_files = [core.project_root / "luma.toml"]
+                for hook in config.hooks:
+                    try:
+                        restart_files.extend(module_sources(hook.endpoint.partition(":")[0]))
+                    except (ImportError, ValueError):
+                        continue
+                reloader = Reloader(
+                    core.ui,
+                    saya,
+                    creart.it(AbstractEventLoop),
+                    require_modules,
+                    restart_files,
+                    core.luma_argv(sys.executable, sys.argv[1:]),
+                )
+                reloader.start()
+
+        with core.profiler.phase("install sampling profiler"):
+            sampler.install(project_cache_dir(core.project_root) / "profiles", saya.channels, core.ui)
+
+        # The run hook blocks until the bot stops
+        core.profiler.report(core.ui)
+        run_hook_target.invoke("core", core, runtime_ctx)
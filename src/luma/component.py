@@ -0,0 +1,120 @@
+"""Dependency graph of the components in `luma.toml`"""
+
+from __future__ import annotations
+
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Callable, Mapping, Sequence, Union
+
+from luma.content import Component
+from luma.exceptions import LumaConfigError
+
+if TYPE_CHECKING:
+    from luma.hook import HookCall
+
+MAX_WORKERS = 8
+
+# Endpoints of the required components, or a function giving the required components from the configured one
+Requirements = Union[Sequence[str], Callable[[Component], Sequence[Component]]]
+
+
+def component_name(endpoint: str) -> str:
+    return endpoint.partition(":")[0]
+
+
+def required_components(component: Component, requires: Mapping[str, Requirements]) -> list[Component]:
+    declared = requires.get(component_name(component.endpoint), ())
+    if callable(declared):
+        return list(declared(component))
+    return [Component(endpoint) for endpoint in declared]
+
+
+def plan_components(
+    components: Sequence[Component],
+    handlers: Mapping[str, Callable],
+    requires: Mapping[str, Requirements],
+) -> list[tuple[Component, list[int]]]:
+    """Order components after the ones they require, with the indexes of their requirements.
+
+    Required components missing from `luma.toml` are added, without arguments unless given by the requirements.
+    Every problem is reported at once, before any handler is called.
+    """
+    planned: list[Component] = []
+    indexes: dict[str, int] = {}
+    errors: list[str] = []
+    for component in components:
+        if component.endpoint in indexes:
+            errors.append(f"Component {component.endpoint} is specified multiple times")
+            continue
+        indexes[component.endpoint] = len(planned)
+        planned.append(component)
+    # Synthesize the requirements, which may require other components as well
+    required: list[list[str]] = []
+    while len(required) < len(planned):
+        requirements = required_components(planned[len(required)], requires)
+        for requirement in requirements:
+            if requirement.endpoint not in indexes:
+                indexes[requirement.endpoint] = len(planned)
+                planned.append(requirement)
+        required.append([requirement.endpoint for requirement in requirements])
+    errors.extend(
+        f"Component {name} does not exist"
+        for name in dict.fromkeys(component_name(component.endpoint) for component in planned)
+        if name not in handlers
+    )
+    if errors:
+        raise LumaConfigError("\n".join(errors))
+
+    order: list[int] = []
+    state: dict[int, bool] = {}  # False while visiting, True once ordered
+
+    def visit(index: int) -> None:
+        if state.get(index) is False:
+            raise LumaConfigError(f"Components require each other through {planned[index].endpoint}")
+        if index in state:
+            return
+        state[index] = False
+        for endpoint in required[index]:
+            visit(indexes[endpoint])
+        state[index] = True
+        order.append(index)
+
+    for index in range(len(planned)):
+        visit(index)
+    position_of = {index: position for position, index in enumerate(order)}
+    return [
+        (
+            planned[index],
+            [position_of[indexes[endpoint]] for endpoint in required[index]],
+        )
+        for index in order
+    ]
+
+
+def call_components(
+    plan: list[tuple[Component, list[int]]],
+    call: Callable[[Component], list[HookCall]],
+) -> list[list[HookCall]]:
+    """Call the planned components in threads, each once its requirements are done.
+
+    Returns the hooks added by each component, in the order of the plan.
+    """
+    results: list[list[HookCall] | None] = [None] * len(plan)
+    if len(plan) <= 1:
+        return [call(component) for component, _ in plan]
+    with ThreadPoolExecutor(min(len(plan), MAX_WORKERS), thread_name_prefix="luma-component") as executor:
+        running: dict[Future, int] = {}
+        submitted: set[int] = set()
+        while len(submitted) < len(plan) or running:
+            for index, (component, requirements) in enumerate(plan):
+                if index not in submitted and all(results[requirement] is not None for requirement in requirements):
+                    submitted.add(index)
+                    running[executor.submit(call, component)] = index
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = running.pop(future)
+                if (error := future.exception()) is not None:
+                    for pending in running:
+                        pending.cancel()
+                    raise error
+                results[index] = future.result()
+    return results  # type: ignore
@@ -1,14 +1,24 @@
-import copy
 import importlib.resources
 import json
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List, Literal, Union
-
-from jsonschema import Draft202012Validator
+from typing import TYPE_CHECKING, Any, Dict, List, Literal, Optional, Union
 
+from luma.cache import digest, dump_cache, load_cache
 from luma.utils import cp_field
 
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+if TYPE_CHECKING:
+    from jsonschema import Draft202012Validator
+
 
 @dataclass
 class Config:
@@ -39,6 +49,32 @@ class Component:
 class Hook:
     endpoint: str
     target: str
+    after: List[str] = cp_field([])
+    """Endpoints of the hooks of the same target to run before this one"""
+    concurrent: bool = False
+    """Run alongside the other hooks of the target, only after the ones in `after`"""
+
+
+@dataclass
+class Preload:
+    enabled: Union[bool, Literal["auto"]] = "auto"
+    workers: Optional[int] = None
+    exclude: List[str] = cp_field([])
+
+
+@dataclass
+class Loop:
+    implementation: str = "asyncio"
+    executor_workers: Optional[int] = None
+    slow_callback_duration: Optional[float] = None
+    debug: bool = False
+    task_factory: Optional[str] = None
+
+
+@dataclass
+class Run:
+    preload: Preload = cp_field(Preload())
+    loop: Loop = cp_field(Loop())
 
 
 @dataclass
@@ -54,21 +90,72 @@ class LumaConfig:
     storage: Dict[str, str] = cp_field({})
     components: List[Component] = cp_field([])
     hooks: List[Hook] = cp_field([])
+    run: Run = cp_field(Run())
+
+
+class TOMLDecodeError(ValueError):
+    """The content is not a valid TOML document"""
+
+
+@lru_cache(maxsize=None)
+def get_content_validator() -> "Draft202012Validator":
+    from jsonschema import Draft202012Validator
+
+    return Draft202012Validator(json.loads(importlib.resources.read_text(__name__, "schema.json", "utf-8")))
+
+
+def __getattr__(name: str) -> Any:
+    if name == "content_validator":
+        return get_content_validator()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def parse_toml(text: str) -> Dict[str, Any]:
+    """Parse TOML into plain Python objects, preferring the non style-preserving parsers"""
+    try:
+        if tomllib is None:
+            import tomlkit
+
+            return tomlkit.parse(text).unwrap()
+        return tomllib.loads(text)
+    except ValueError as e:
+        raise TOMLDecodeError(*e.args) from e
+
 
+def content_cache_key(raw: bytes, version: str) -> str:
+    module_dir = Path(__file__).parent
+    return digest(
+        raw,
+        version,
+        str((module_dir / "__init__.py").stat().st_mtime_ns),
+        str((module_dir / "schema.json").stat().st_mtime_ns),
+    )
 
-content_validator = Draft202012Validator(json.loads(importlib.resources.read_text(__name__, "schema.json", "utf-8")))
 
+def load_content(config_file: Path, cache_dir: Optional[Path] = None, version: str = "") -> LumaConfig:
+    """Load and validate `luma.toml`.
 
-def load_content(config_file: Path) -> LumaConfig:
-    import tomlkit
+    :param cache_dir: if given, the validated result is cached in it,
+    keyed on the file content and the Luma version.
+    """
+    raw = config_file.read_bytes()
+    cache_path = cache_dir and cache_dir / "luma.toml.pickle"
+    cache_key = ""
+    if cache_path:
+        cache_key = content_cache_key(raw, version)
+        if isinstance(cached := load_cache(cache_path, cache_key), LumaConfig):
+            return cached
     from dacite.config import Config
     from dacite.core import from_dict
 
-    with open(config_file, "r", encoding="utf-8") as fp:
-        doc = tomlkit.load(fp)
-        doc.pop("$schema", None)
-    data = doc.unwrap()
-    errs = list(content_validator.iter_errors(data))
-    if errs:
-        raise ValueError("Invalid `luma.toml`", errs)
-    return from_dict(LumaConfig, data, Config(strict=True))
+    from luma.content.validator import validate
+
+    data = parse_toml(raw.decode("utf-8"))
+    data.pop("$schema", None)
+    if not validate(data):
+        # Only the slow validator gives detailed errors
+        raise ValueError("Invalid `luma.toml`", list(get_content_validator().iter_errors(data)))
+    config = from_dict(LumaConfig, data, Config(strict=True))
+    if cache_path:
+        dump_cache(cache_path, cache_key, config)
+    return config
@@ -0,0 +1,195 @@
+"""Generate `luma.content.validator` from `schema.json`
+
+Run `python -m luma.content.generate` after editing the schema,
+or `python -m luma.content.generate --check` to verify it is up to date.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import re
+import sys
+from pathlib import Path
+from typing import Any
+
+SCHEMA_PATH = Path(__file__).with_name("schema.json")
+VALIDATOR_PATH = Path(__file__).with_name("validator.py")
+
+TYPE_CHECKS = {
+    "object": "isinstance({0}, dict)",
+    "array": "isinstance({0}, list)",
+    "string": "isinstance({0}, str)",
+    "boolean": "isinstance({0}, bool)",
+    "integer": "(isinstance({0}, int) and not isinstance({0}, bool))",
+    "number": "(isinstance({0}, (int, float)) and not isinstance({0}, bool))",
+}
+# Keywords that don't affect validation
+ANNOTATIONS = {"$schema", "$defs", "title", "description", "default"}
+SUPPORTED = ANNOTATIONS | {"type", "properties", "required", "additionalProperties", "items", "anyOf", "enum", "$ref"}
+
+
+class ValidatorGenerator:
+    """Compile a JSON schema into a plain Python function returning whether the data is valid.
+
+    Only the keywords used by Luma's schema are supported,
+    others raise `NotImplementedError` during generation.
+    """
+
+    def __init__(self, schema: dict[str, Any]) -> None:
+        self.schema = schema
+        self.functions: dict[str, list[str]] = {}
+        self.counter = 0
+
+    def function_name(self, ref: str) -> str:
+        return "_validate_" + re.sub(r"\W", "_", ref.rpartition("/")[2])
+
+    def resolve(self, ref: str) -> dict[str, Any]:
+        if not ref.startswith("#/$defs/"):
+            raise NotImplementedError(f"Unsupported reference: {ref}")
+        return self.schema["$defs"][ref[len("#/$defs/") :]]
+
+    def add_function(self, name: str, schema: dict[str, Any]) -> str:
+        if name not in self.functions:
+            self.functions[name] = []  # Reserve the name for recursive references
+            body = self.emit(schema, "data", 1)
+            self.functions[name] = [f"def {name}(data: Any) -> bool:", *body, "    return True"]
+        return name
+
+    def emit(self, schema: dict[str, Any], var: str, level: int) -> list[str]:
+        """Emit statements that return False if `var` doesn't match the schema"""
+        if unsupported := set(schema) - SUPPORTED:
+            raise NotImplementedError(f"Unsupported keywords: {sorted(unsupported)}")
+        indent = "    " * level
+        lines: list[str] = []
+        if ref := schema.get("$ref"):
+            target = self.add_function(self.function_name(ref), self.resolve(ref))
+            lines.append(f"{indent}if not {target}({var}):")
+            lines.append(f"{indent}    return False")
+        if "type" in schema:
+            lines.append(f"{indent}if not {TYPE_CHECKS[schema['type']].format(var)}:")
+            lines.append(f"{indent}    return False")
+        if "enum" in schema:
+            if not all(isinstance(choice, str) for choice in schema["enum"]):
+                raise NotImplementedError("Only string enums are supported")
+            choices = "".join(f"{json.dumps(choice)}, " for choice in schema["enum"]).rstrip()
+            lines.append(f"{indent}if not isinstance({var}, str) or {var} not in ({choices}):")
+            lines.append(f"{indent}    return False")
+        if "anyOf" in schema:
+            branches = []
+            for sub_schema in schema["anyOf"]:
+                if set(sub_schema) == {"$ref"}:
+                    name = self.function_name(sub_schema["$ref"])
+                    branches.append(self.add_function(name, self.resolve(sub_schema["$ref"])))
+                    continue
+                self.counter += 1
+                branches.append(self.add_function(f"_validate_branch_{self.counter}", sub_schema))
+            lines.append(f"{indent}if not ({' or '.join(f'{branch}({var})' for branch in branches)}):")
+            lines.append(f"{indent}    return False")
+        if "items" in schema:
+            item = f"item_{level}"
+            if schema.get("type") == "array":
+                lines.append(f"{indent}for {item} in {var}:")
+                lines.extend(self.emit(schema["items"], item, level + 1) or [f"{indent}    pass"])
+            else:
+                lines.append(f"{indent}if isinstance({var}, list):")
+                lines.append(f"{indent}    for {item} in {var}:")
+                lines.extend(self.emit(schema["items"], item, level + 2) or [f"{indent}        pass"])
+        if {"properties", "required", "additionalProperties"} & set(schema):
+            if schema.get("type") == "object":
+                lines.extend(self.emit_object(schema, var, level))
+            elif object_lines := self.emit_object(schema, var, level + 1):
+                lines.append(f"{indent}if isinstance({var}, dict):")
+                lines.extend(object_lines)
+        return lines
+
+    def emit_object(self, schema: dict[str, Any], var: str, level: int) -> list[str]:
+        """Emit checks of an object known to be a dict"""
+        indent = "    " * level
+        key, value = f"key_{level}", f"value_{level}"
+        lines: list[str] = []
+        for name in schema.get("required", []):
+            lines.append(f"{indent}if {json.dumps(name)} not in {var}:")
+            lines.append(f"{indent}    return False")
+        properties: dict[str, Any] = schema.get("properties", {})
+        additional = schema.get("additionalProperties", True)
+        checks_additional = additional is not True and additional != {}
+        if not properties and not checks_additional:
+            return lines
+        lines.append(f"{indent}for {key}, {value} in {var}.items():")
+        for index, (name, sub_schema) in enumerate(properties.items()):
+            lines.append(f"{indent}    {'elif' if index else 'if'} {key} == {json.dumps(name)}:")
+            lines.extend(self.emit(sub_schema, value, level + 2) or [f"{indent}        pass"])
+        additional_level = level + 1
+        if properties and checks_additional:
+            lines.append(f"{indent}    else:")
+            additional_level += 1
+        if additional is False:
+            lines.append(f"{'    ' * additional_level}return False")
+        elif checks_additional:
+            lines.extend(self.emit(additional, value, additional_level))
+        return lines
+
+    def generate(self, digest: str) -> str:
+        self.add_function("validate", self.schema)
+        functions = "\n\n\n".join("\n".join(lines) for lines in reversed(self.functions.values()))
+        return "\n".join(
+            [
+                '"""Validator for `luma.toml`, generated from `schema.json` by `luma.content.generate`.',
+                "",
+                "DO NOT EDIT MANUALLY.",
+                '"""',
+                "",
+                "from typing import Any",
+                "",
+                f'SCHEMA_DIGEST = "{digest}"',
+                "",
+                "",
+                functions,
+                "",
+            ]
+        )
+
+
+def render() -> str:
+    raw = SCHEMA_PATH.read_bytes()
+    return ValidatorGenerator(json.loads(raw)).generate(hashlib.sha256(raw).hexdigest())
+
+
+def benchmark(config_file: Path, number: int) -> None:
+    """Compare the generated validator against jsonschema on a `luma.toml`"""
+    import timeit
+
+    from luma.content import get_content_validator, parse_toml
+    from luma.content.validator import validate
+
+    data = parse_toml(config_file.read_text("utf-8"))
+    data.pop("$schema", None)
+    setup_time = timeit.timeit(lambda: get_content_validator.__wrapped__(), number=1)
+    validator = get_content_validator()
+    results = {
+        "jsonschema": timeit.timeit(lambda: validator.is_valid(data), number=number),
+        "generated": timeit.timeit(lambda: validate(data), number=number),
+    }
+    print(f"jsonschema validator construction: {setup_time * 1e3:.3f} ms")
+    for name, total in results.items():
+        print(f"{name:>10}: {total / number * 1e6:.2f} us per validation ({number} runs)")
+
+
+def main(args: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true", help="exit with 1 if the validator is outdated")
+    parser.add_argument("--benchmark", type=Path, metavar="LUMA_TOML", help="benchmark against jsonschema")
+    parser.add_argument("--number", type=int, default=1000, help="validations per benchmark run")
+    options = parser.parse_args(args)
+    if options.benchmark:
+        return benchmark(options.benchmark, options.number)
+    source = render()
+    if options.check:
+        sys.exit(0 if VALIDATOR_PATH.exists() and VALIDATOR_PATH.read_text("utf-8") == source else 1)
+    VALIDATOR_PATH.write_text(source, "utf-8")
+
+
+if __name__ == "__main__":
+    main()
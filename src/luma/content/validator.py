@@ -0,0 +1,240 @@
+"""Validator for `luma.toml`, generated from `schema.json` by `luma.content.generate`.
+
+DO NOT EDIT MANUALLY.
+"""
+
+from typing import Any
+
+SCHEMA_DIGEST = "7547fbb50c95fc8cea8d7857d14181ab91e117a9010ce1e0c0e870109cad3151"
+
+
+def _validate_luma_content_Metadata(data: Any) -> bool:
+    if not isinstance(data, dict):
+        return False
+    for key_1, value_1 in data.items():
+        if key_1 == "version":
+            if not isinstance(value_1, str):
+                return False
+        else:
+            return False
+    return True
+
+
+def _validate_luma_content_Loop(data: Any) -> bool:
+    if not isinstance(data, dict):
+        return False
+    for key_1, value_1 in data.items():
+        if key_1 == "implementation":
+            if not isinstance(value_1, str):
+                return False
+        elif key_1 == "executor_workers":
+            if not (isinstance(value_1, int) and not isinstance(value_1, bool)):
+                return False
+        elif key_1 == "slow_callback_duration":
+            if not (isinstance(value_1, (int, float)) and not isinstance(value_1, bool)):
+                return False
+        elif key_1 == "debug":
+            if not isinstance(value_1, bool):
+                return False
+        elif key_1 == "task_factory":
+            if not isinstance(value_1, str):
+                return False
+        else:
+            return False
+    return True
+
+
+def _validate_branch_2(data: Any) -> bool:
+    if not isinstance(data, str) or data not in ("auto",):
+        return False
+    return True
+
+
+def _validate_branch_1(data: Any) -> bool:
+    if not isinstance(data, bool):
+        return False
+    return True
+
+
+def _validate_luma_content_Preload(data: Any) -> bool:
+    if not isinstance(data, dict):
+        return False
+    for key_1, value_1 in data.items():
+        if key_1 == "enabled":
+            if not (_validate_branch_1(value_1) or _validate_branch_2(value_1)):
+                return False
+        elif key_1 == "workers":
+            if not (isinstance(value_1, int) and not isinstance(value_1, bool)):
+                return False
+        elif key_1 == "exclude":
+            if not isinstance(value_1, list):
+                return False
+            for item_3 in value_1:
+                if not isinstance(item_3, str):
+                    return False
+        else:
+            return False
+    return True
+
+
+def _validate_luma_content_Run(data: Any) -> bool:
+    if not isinstance(data, dict):
+        return False
+    for key_1, value_1 in data.items():
+        if key_1 == "preload":
+            if not _validate_luma_content_Preload(value_1):
+                return False
+        elif key_1 == "loop":
+            if not _validate_luma_content_Loop(value_1):
+                return False
+        else:
+            return False
+    return True
+
+
+def _validate_luma_content_Hook(data: Any) -> bool:
+    if not isinstance(data, dict):
+        return False
+    if "endpoint" not in data:
+        return False
+    if "target" not in data:
+        return False
+    for key_1, value_1 in data.items():
+        if key_1 == "endpoint":
+            if not isinstance(value_1, str):
+                return False
+        elif key_1 == "target":
+            if not isinstance(value_1, str):
+                return False
+        elif key_1 == "after":
+            if not isinstance(value_1, list):
+                return False
+            for item_3 in value_1:
+                if not isinstance(item_3, str):
+                    return False
+        elif key_1 == "concurrent":
+            if not isinstance(value_1, bool):
+                return False
+        else:
+            return False
+    return True
+
+
+def _validate_luma_content_Component(data: Any) -> bool:
+    if not isinstance(data, dict):
+        return False
+    if "endpoint" not in data:
+        return False
+    for key_1, value_1 in data.items():
+        if key_1 == "endpoint":
+            if not isinstance(value_1, str):
+                return False
+        elif key_1 == "args":
+            if not isinstance(value_1, dict):
+                return False
+        else:
+            return False
+    return True
+
+
+def _validate_luma_content_MultiModule(data: Any) -> bool:
+    if not isinstance(data, dict):
+        return False
+    if "endpoint" not in data:
+        return False
+    if "type" not in data:
+        return False
+    for key_1, value_1 in data.items():
+        if key_1 == "endpoint":
+            if not isinstance(value_1, str):
+                return False
+        elif key_1 == "type":
+            if not isinstance(value_1, str) or value_1 not in ("multi",):
+                return False
+        elif key_1 == "exclude":
+            if not isinstance(value_1, list):
+                return False
+            for item_3 in value_1:
+                if not isinstance(item_3, str):
+                    return False
+        else:
+            return False
+    return True
+
+
+def _validate_luma_content_SingleModule(data: Any) -> bool:
+    if not isinstance(data, dict):
+        return False
+    if "endpoint" not in data:
+        return False
+    for key_1, value_1 in data.items():
+        if key_1 == "endpoint":
+            if not isinstance(value_1, str):
+                return False
+        elif key_1 == "type":
+            if not isinstance(value_1, str) or value_1 not in ("single",):
+                return False
+        else:
+            return False
+    return True
+
+
+def _validate_luma_content_Config(data: Any) -> bool:
+    if not isinstance(data, dict):
+        return False
+    for key_1, value_1 in data.items():
+        if key_1 == "endpoints":
+            if not isinstance(value_1, dict):
+                return False
+            for key_3, value_3 in value_1.items():
+                if not isinstance(value_3, str):
+                    return False
+        elif key_1 == "format":
+            if not isinstance(value_1, dict):
+                return False
+        else:
+            return False
+    return True
+
+
+def validate(data: Any) -> bool:
+    if not isinstance(data, dict):
+        return False
+    for key_1, value_1 in data.items():
+        if key_1 == "config":
+            if not _validate_luma_content_Config(value_1):
+                return False
+        elif key_1 == "modules":
+            if not isinstance(value_1, list):
+                return False
+            for item_3 in value_1:
+                if not (_validate_luma_content_SingleModule(item_3) or _validate_luma_content_MultiModule(item_3)):
+                    return False
+        elif key_1 == "storage":
+            if not isinstance(value_1, dict):
+                return False
+            for key_3, value_3 in value_1.items():
+                if not isinstance(value_3, str):
+                    return False
+        elif key_1 == "components":
+            if not isinstance(value_1, list):
+                return False
+            for item_3 in value_1:
+                if not _validate_luma_content_Component(item_3):
+                    return False
+        elif key_1 == "hooks":
+            if not isinstance(value_1, list):
+                return False
+            for item_3 in value_1:
+                if not _validate_luma_content_Hook(item_3):
+                    return False
+        elif key_1 == "run":
+            if not _validate_luma_content_Run(value_1):
+                return False
+        elif key_1 == "metadata":
+            if not _validate_luma_content_Metadata(value_1):
+                return False
+        elif key_1 == "$schema":
+            if not isinstance(value_1, str):
+                return False
+    return True
@@ -0,0 +1,198 @@
+"""Conversion of TOML values to the annotated types of constructors"""
+
+from __future__ import annotations
+
+import dataclasses
+import inspect
+import re
+import typing
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Literal, Tuple, Union
+
+from luma.exceptions import LumaConfigError
+
+Converter = Callable[[Any, str], Any]
+
+DURATION_UNITS = {"ms": 1e-3, "s": 1.0, "m": 60.0, "h": 3600.0, "d": 86400.0}
+SIZE_UNITS = {
+    "b": 1,
+    "kb": 1000,
+    "mb": 1000**2,
+    "gb": 1000**3,
+    "kib": 1024,
+    "mib": 1024**2,
+    "gib": 1024**3,
+}
+DURATION_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*(ms|s|m|h|d)", re.IGNORECASE)
+SIZE_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*([kmg]i?b|b)?", re.IGNORECASE)
+
+
+class Duration(float):
+    """Seconds, given as a number or a string like `30s`, `1.5h` or `1m30s`"""
+
+
+class ByteSize(int):
+    """Bytes, given as a number or a string like `64MiB` or `10KB`"""
+
+
+class ConversionError(ValueError):
+    def __init__(self, path: str, message: str) -> None:
+        super().__init__(f"{path}: {message}")
+
+
+def parse_duration(value: Any, path: str = "value") -> Duration:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return Duration(value)
+    if isinstance(value, str):
+        text = value.replace(" ", "")
+        parts = DURATION_PATTERN.findall(text)
+        if parts and "".join(number + unit for number, unit in parts) == text:
+            return Duration(sum(float(number) * DURATION_UNITS[unit.lower()] for number, unit in parts))
+    raise ConversionError(path, f"expected a duration like '30s', got {value!r}")
+
+
+def parse_size(value: Any, path: str = "value") -> ByteSize:
+    if isinstance(value, int) and not isinstance(value, bool):
+        return ByteSize(value)
+    if isinstance(value, str) and (match := SIZE_PATTERN.fullmatch(value.strip())):
+        number, unit = match.groups()
+        return ByteSize(float(number) * SIZE_UNITS[(unit or "b").lower()])
+    raise ConversionError(path, f"expected a size like '64MiB', got {value!r}")
+
+
+def type_name(tp: Any) -> str:
+    return getattr(tp, "__name__", None) or repr(tp)
+
+
+def converter_for(tp: Any) -> Converter:
+    """Build a converter checking or converting a value to the type"""
+    if tp is Any or tp is inspect.Parameter.empty:
+        return lambda value, path: value
+    if tp is Duration:
+        return parse_duration
+    if tp is ByteSize:
+        return parse_size
+    origin, args = typing.get_origin(tp), typing.get_args(tp)
+    if origin is Union:
+        members = [converter_for(arg) for arg in args if arg is not type(None)]
+        optional = type(None) in args
+
+        def convert_union(value: Any, path: str) -> Any:
+            if value is None and optional:
+                return None
+            if len(members) == 1:
+                return members[0](value, path)
+            for member in members:
+                try:
+                    return member(value, path)
+                except ConversionError:
+                    continue
+            raise ConversionError(path, f"expected {tp}, got {value!r}")
+
+        return convert_union
+    if origin is Literal:
+
+        def convert_literal(value: Any, path: str) -> Any:
+            if value not in args:
+                raise ConversionError(path, f"expected one of {', '.join(map(repr, args))}, got {value!r}")
+            return value
+
+        return convert_literal
+    if origin in (list, set, frozenset, tuple):
+        if origin is tuple and not (len(args) == 2 and args[1] is Ellipsis):
+            items = [converter_for(arg) for arg in args]
+        else:
+            items = [converter_for(args[0] if args else Any)]
+
+        def convert_sequence(value: Any, path: str) -> Any:
+            if not isinstance(value, list):
+                raise ConversionError(path, f"expected an array, got {value!r}")
+            if len(items) > 1 and len(value) != len(items):
+                raise ConversionError(path, f"expected {len(items)} items, got {len(value)}")
+            return origin(
+                items[index if len(items) > 1 else 0](item, f"{path}[{index}]") for index, item in enumerate(value)
+            )
+
+        return convert_sequence
+    if origin is dict:
+        key, item = converter_for(args[0] if args else Any), converter_for(args[1] if args else Any)
+
+        def convert_mapping(value: Any, path: str) -> Any:
+            if not isinstance(value, dict):
+                raise ConversionError(path, f"expected a table, got {value!r}")
+            return {key(k, f"{path}.{k}"): item(v, f"{path}.{k}") for k, v in value.items()}
+
+        return convert_mapping
+    if dataclasses.is_dataclass(tp):
+        fields = kwargs_converter(tp)
+
+        def convert_dataclass(value: Any, path: str) -> Any:
+            return value if isinstance(value, tp) else tp(**fields(value, path))
+
+        return convert_dataclass
+    if tp is float:
+
+        def convert_float(value: Any, path: str) -> Any:
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ConversionError(path, f"expected a number, got {value!r}")
+            return float(value)
+
+        return convert_float
+    if isinstance(tp, type):
+
+        def convert_instance(value: Any, path: str) -> Any:
+            # bool is an int, but never meant as one
+            if not isinstance(value, tp) or (isinstance(value, bool) and tp is not bool):
+                raise ConversionError(path, f"expected {type_name(tp)}, got {value!r}")
+            return value
+
+        return convert_instance
+    return lambda value, path: value
+
+
+@lru_cache(maxsize=None)
+def kwargs_converter(cls: Callable) -> Converter:
+    """Build a converter of keyword arguments to the parameters of a constructor, cached per class"""
+    # Generated `__init__` of dataclasses are not annotated with the types of the fields
+    target = cls if dataclasses.is_dataclass(cls) else cls.__init__ if isinstance(cls, type) else cls
+    signature = inspect.signature(cls)
+    try:
+        hints = typing.get_type_hints(target)
+    except Exception:
+        # Unresolvable annotations are not checked
+        hints = {}
+    parameters: Dict[str, Tuple[Converter, bool]] = {}
+    var_keyword = False
+    for name, parameter in signature.parameters.items():
+        if parameter.kind is parameter.VAR_KEYWORD:
+            var_keyword = True
+        elif parameter.kind is not parameter.VAR_POSITIONAL:
+            required = parameter.default is parameter.empty and parameter.kind is not parameter.POSITIONAL_ONLY
+            parameters[name] = (converter_for(hints.get(name, Any)), required)
+    cls_name = type_name(cls)
+
+    def convert(value: Any, path: str) -> Any:
+        if not isinstance(value, dict):
+            raise ConversionError(path, f"expected a table for {cls_name}, got {value!r}")
+        kwargs: Dict[str, Any] = {}
+        for key, item in value.items():
+            if key in parameters:
+                kwargs[key] = parameters[key][0](item, f"{path}.{key}")
+            elif var_keyword:
+                kwargs[key] = item
+            else:
+                raise ConversionError(f"{path}.{key}", f"unexpected argument of {cls_name}")
+        missing: List[str] = [name for name, (_, required) in parameters.items() if required and name not in value]
+        if missing:
+            raise ConversionError(path, f"missing argument(s) of {cls_name}: {', '.join(missing)}")
+        return kwargs
+
+    return convert
+
+
+def convert_kwargs(cls: Callable, kwargs: Dict[str, Any], source: str) -> Dict[str, Any]:
+    """Convert the keyword arguments of a constructor from TOML values, reporting errors as config errors"""
+    try:
+        return kwargs_converter(cls)(kwargs, "args")
+    except ConversionError as e:
+        raise LumaConfigError(f"Invalid arguments of {source}: {e}") from e
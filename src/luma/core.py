@@ -11,27 +11,48 @@ from __future__ import annotations
 import argparse
 import json
 import os
+import shutil
 import subprocess
 import sys
+from contextlib import suppress
 from pathlib import Path
-from typing import Any, Callable
+from typing import Any, Callable, Sequence
 
 import importlib_metadata as pkg_meta
-from rich.markup import escape
-from rich.traceback import Traceback
 from typing_extensions import Self
 
 from luma import term
-from luma.cli.command import Command, bot_path_option, python_option, verbose_option
+from luma.cache import (
+    EntryPointIndex,
+    digest,
+    dump_cache,
+    interpreter_tag,
+    load_cache,
+    project_cache_dir,
+    user_cache_dir,
+)
+from luma.cli import fast
+from luma.cli.command import (
+    Command,
+    bot_path_option,
+    profile_options,
+    python_option,
+    verbose_option,
+)
 from luma.cli.utils import ErrorArgumentParser, LumaFormatter
-from luma.content import Component, LumaConfig, load_content
-from luma.exceptions import LumaArgumentError, LumaConfigError, LumaError
-from luma.hook import HookManager
-from luma.utils import load_from_string
+from luma.component import Requirements, call_components, plan_components
+from luma.content import Component, LumaConfig, TOMLDecodeError, load_content
+from luma.exceptions import LumaArgumentError, LumaError
+from luma.hook import HookCall, HookManager, LazyEndpoint
+from luma.profiling import StartupProfiler
+
+# Prefix of the environment Luma is installed in, given to reforged interpreters
+SITE_PREFIX_ENV = "LUMA_SITE_PREFIX"
 
 
 class Core:
-    def __init__(self) -> None:
+    def __init__(self, lazy: bool | None = None, profiler: StartupProfiler | None = None) -> None:
+        self.profiler: StartupProfiler = profiler or StartupProfiler()
         self.parser: ErrorArgumentParser = ErrorArgumentParser(
             "luma",
             description=term.style(__doc__, style="primary"),
@@ -41,52 +62,120 @@ class Core:
         self.ui: term.UI = term.UI()
         self.config: LumaConfig | None = None
         self.python = sys.executable
-        self.version: str = pkg_meta.version("luma") or "development"
+        self.entry_points: EntryPointIndex = EntryPointIndex.load()
+        self.version: str = self.entry_points.version("luma") or "development"
         self.hooks: HookManager = HookManager(self.ui)
         self.component_handlers: dict[str, Callable[[Self, dict[str, Any]], None]] = {}
+        # Components required by each component, added to the configured ones if missing
+        self.component_requires: dict[str, Requirements] = {}
         self.called_components: set[str] = set()
-        self._tweak_parser()
-        self._load_plugins()
+        # Lazily registered commands, which are loaded only when invoked
+        self.lazy: bool = not os.getenv("LUMA_EAGER_PLUGINS") if lazy is None else lazy
+        self._lazy_commands: dict[str, pkg_meta.EntryPoint] = {}
+        self._registered_commands: list[tuple[str, str | None]] | None = None
+        with self.profiler.phase("tweak parser"):
+            self._tweak_parser()
+        with self.profiler.phase("load plugins"):
+            self._load_plugins()
 
     def _tweak_parser(self):
+        self.version_text = "{}, version {}".format(
+            term.style("Luma", style="bold"),
+            term.style(self.version, style="success"),
+        )
         self.parser.add_argument(
             "-V",
             "--version",
             action="version",
-            version="{}, version {}".format(
-                term.style("Luma", style="bold"),
-                term.style(self.version, style="success"),
-            ),
+            version=self.version_text,
             help="show the version and exit",
         )
         bot_path_option.add_to_parser(self.parser)
         python_option.add_to_parser(self.parser)
         verbose_option.add_to_parser(self.parser)
+        for option in profile_options:
+            option.add_to_parser(self.parser)
         self.parser._positionals.title = "Commands"
 
-    def _load_plugins(self):
-        for plugin in pkg_meta.entry_points(group="luma.plugin"):
-            try:
+    def _load_plugin(self, plugin: pkg_meta.EntryPoint) -> list[tuple[str, str | None]]:
+        """Load a plugin and return the commands (name, help) it registered.
+
+        None are returned for plugins registering anything else, so that they are always loaded.
+        """
+        self._registered_commands = commands = []
+        registrations = self._registrations()
+        try:
+            with self.profiler.phase(f"plugin {plugin.name}"):
                 plugin.load()(self)
-            except Exception as e:
-                self.ui.echo(
-                    f"Failed to load plugin {plugin.name}={plugin.value}: {e!r}",
-                    style="error",
-                    err=True,
+            if self._registrations() != registrations:
+                commands.clear()
+        except Exception as e:
+            self.ui.echo(
+                f"Failed to load plugin {plugin.name}={plugin.value}: {e!r}",
+                style="error",
+                err=True,
+            )
+            commands.clear()  # Always load it to report the failure
+        finally:
+            self._registered_commands = None
+        return commands
+
+    def _registrations(self) -> tuple[int, int, int]:
+        """Count the component handlers, requirements and hooks registered so far"""
+        hooks = sum(
+            len(entries) for target in self.hooks.targets.values() for entries in (target.pre, target.core, target.post)
+        )
+        return len(self.component_handlers), len(self.component_requires), hooks
+
+    def _load_plugins(self):
+        manifest_path = user_cache_dir() / f"commands-{interpreter_tag()}.pickle"
+        manifest: list[tuple[str, str, list[tuple[str, str | None]]]] | None = None
+        if self.lazy:
+            manifest = load_cache(manifest_path, self.entry_points.key)
+        if manifest is None:
+            manifest = [
+                (plugin.name, plugin.value, self._load_plugin(plugin))
+                for plugin in self.entry_points.select("luma.plugin")
+            ]
+            dump_cache(manifest_path, self.entry_points.key, manifest)
+            return
+        for name, value, commands in manifest:
+            plugin = pkg_meta.EntryPoint(name, value, "luma.plugin")
+            if not commands:  # Plugins that don't provide commands are always loaded
+                self._load_plugin(plugin)
+            for command_name, help_text in commands:
+                self.subparsers.add_parser(
+                    command_name,
+                    description=help_text,
+                    help=help_text,
+                    formatter_class=LumaFormatter,
                 )
+                self._lazy_commands[command_name] = plugin
 
-    def _load_luma_file(self, config_file: Path) -> None:
-        from tomlkit.exceptions import ParseError
+    def _load_lazy_command(self, args: list[str]) -> None:
+        """Load the plugin providing the command selected by args"""
+        valued_options = {opt for action in self.parser._actions if action.nargs != 0 for opt in action.option_strings}
+        args_iter = iter(args)
+        for arg in args_iter:
+            if arg.startswith("-"):
+                if arg in valued_options:
+                    next(args_iter, None)
+                continue
+            if plugin := self._lazy_commands.pop(arg, None):
+                self.ui.echo(f"Loading plugin [info]{plugin.name}[/info] for command [info]{arg}[/info]", verbosity=2)
+                self._load_plugin(plugin)
+            return
 
+    def _load_luma_file(self, config_file: Path) -> None:
         if config_file.exists():
             try:
-                self.config = load_content(config_file)
+                self.config = load_content(config_file, project_cache_dir(config_file.parent), self.version)
                 if (metadata_v := self.config.metadata.version) != "0.1":
                     self.ui.echo(f"[error]Incompatible [req]luma.toml[/req] version: {metadata_v}")
                     self.config = None
                     return
-            except ParseError as e:
-                self.ui.echo(f"[req]luma.toml[/req] is invalid TOML file: {e!r}", err=True)
+            except TOMLDecodeError as e:
+                self.ui.echo(f"[req]luma.toml[/req] is invalid TOML file: {e.__cause__!r}", err=True)
             except ValueError as e:  # JSON Schema error
                 self.ui.echo("[req]luma.toml[/req] is not valid", err=True)
                 if self.ui.verbosity and "luma.toml" in str(e):
@@ -98,68 +187,114 @@ class Core:
     def register_command(self, command: type[Command]) -> None:
         self.ui.echo(f"Registering command [info]{command.name}[/info]", verbosity=2)
         command.register_to(self.subparsers)
+        if self._registered_commands is not None:
+            self._registered_commands.append((command.name or "", command.description or command.__doc__))
+
+    def _guess_interpreter(self) -> str:
+        """Find the interpreter `python` resolves to, cached per project.
+
+        The cache is keyed on `PATH` and the virtual environment markers.
+        """
+        markers = [os.getenv(var, "") for var in ("PATH", "VIRTUAL_ENV", "CONDA_PREFIX", "PYENV_VERSION")]
+        for marker_file in (".venv/pyvenv.cfg", ".python-version"):
+            with suppress(OSError):
+                markers.append(f"{marker_file}:{(self.project_root / marker_file).stat().st_mtime_ns}")
+        key = digest(*markers)
+        cache_path = project_cache_dir(self.project_root) / "interpreter.pickle"
+        py_path: str | None = load_cache(cache_path, key)
+        if py_path and os.path.exists(py_path):
+            return py_path
+        self.ui.echo("[info]Guessing Python path from invoking subprocess...", verbosity=1)
+        python = shutil.which("python")
+        if python is None:
+            return self.python
+        py_path = subprocess.run(
+            [python, "-X", "utf8", "-c", "import sys;print(sys.executable, end='')"],
+            encoding="utf-8",
+            stdout=subprocess.PIPE,
+        ).stdout
+        if not py_path:
+            return self.python
+        dump_cache(cache_path, key, py_path)
+        return py_path
+
+    def luma_argv(self, python: str, args: Sequence[str]) -> list[str]:
+        """Command line running Luma with the arguments on an interpreter, which may not have Luma installed"""
+        # Reforged interpreters keep the prefix of the environment Luma is installed in for their own children
+        prefix = os.getenv(SITE_PREFIX_ENV, sys.prefix)
+        bootstrap = [
+            "import os",
+            "import site",
+            "import sys",
+            f"os.environ[{SITE_PREFIX_ENV!r}] = {json.dumps(prefix)}",
+            f"site.addsitepackages(set(sys.path), [{json.dumps(prefix)}])",
+            "import luma.core",
+            "luma.core.main()",
+        ]
+        return [python, "-c", "\n".join(bootstrap), *args]
 
     def _reforge_interpreter_env(self, py_path: str | None):
         orig_py_path = py_path
         if py_path is None:
-            self.ui.echo("[info]Guessing Python path from invoking subprocess...", verbosity=1)
-            py_path = subprocess.run(
-                ["python", "-X", "utf8", "-c", "import sys;print(sys.executable, end='')"],
-                shell=True,
-                encoding="utf-8",
-                stdout=subprocess.PIPE,
-            ).stdout
+            py_path = self._guess_interpreter()
         if self.python != py_path:
             self.ui.echo("[info]Regenerating [primary]Luma[/primary] process")
-            subprocess.run(
-                [
-                    py_path,
-                    "-c",
-                    "\n".join(
-                        [
-                            "import site",
-                            "import sys",
-                            f"site.addsitepackages(set(sys.path), [{json.dumps(sys.prefix)}])",
-                            "import luma.core",
-                            "luma.core.main()",
-                        ]
-                    ),
-                ]
-                + sys.argv[1:]
-                + (["--python-path", py_path] if orig_py_path is None else []),
-            )
-            sys.exit(0)
+            argv = self.luma_argv(py_path, sys.argv[1:]) + (["--python-path", py_path] if orig_py_path is None else [])
+            sys.stdout.flush()
+            sys.stderr.flush()
+            if os.name == "posix":
+                # Replace the current process, so signals and exit code are native to the new interpreter
+                os.execv(py_path, argv)
+            with subprocess.Popen(argv) as proc:
+                while True:
+                    try:
+                        sys.exit(proc.wait())
+                    except KeyboardInterrupt:  # Console signals are delivered to the child as well
+                        continue
 
     def _load_components(self) -> None:
-        for ep in pkg_meta.entry_points(group="luma.component"):
+        for ep in self.entry_points.select("luma.component"):
             # NOTE: Here we assume EVERY component is CORRECTLY implemented.
-            ep.load()(self)
+            with self.profiler.phase(f"load component {ep.name}"):
+                ep.load()(self)
 
-    def _call_component(self, component: Component) -> None:
+    def _call_component(self, component: Component) -> list[HookCall]:
+        """Call the handler of a component, returning the hooks it adds"""
         name, _, sub = component.endpoint.partition(":")
-        try:
-            handler = self.component_handlers[name]
-        except KeyError as exc:
-            msg = f"Component {name} does not exist!"
-            raise LumaConfigError(msg) from exc
         args = {"__sub__": sub or None, **component.args}
-        handler(self, args)
-        self.called_components.union((name, component.endpoint))
+        with self.profiler.phase(f"component {component.endpoint}"), self.hooks.record() as calls:
+            self.component_handlers[name](self, args)
+        self.called_components.update((name, component.endpoint))
+        return calls
 
     def _bootstrap_luma_file(self):
         if not self.config:
             return
-        for component in self.config.components:
-            self._call_component(component)
+        with self.profiler.phase("call components"):
+            plan = plan_components(self.config.components, self.component_handlers, self.component_requires)
+            # Handlers run in parallel, their hooks are added in the order of the plan
+            for calls in call_components(plan, self._call_component):
+                self.hooks.replay(calls)
         for hook in self.config.hooks:
-            hook_fn = load_from_string(hook.endpoint)
-            if not callable(hook_fn):
-                self.ui.echo(f"[error][info]{hook.endpoint}[/info] is not callable, skipping", err=True)
-                continue
-            self.hooks.add_hook(hook.target, load_from_string(hook.endpoint))
+            # Imported when the stage of the hook runs
+            self.hooks.add_hook(
+                hook.target,
+                LazyEndpoint(hook.endpoint),
+                name=hook.endpoint,
+                after=hook.after,
+                concurrent=hook.concurrent,
+            )
 
     def main(self, args: list[str] | None) -> None:
         args = args or sys.argv[1:]
+        if query := fast.query_of(args):
+            # Render answers of all the queries, so that following ones can be answered without Core
+            rendered = {"help": self.parser.format_help(), "version": f"{self.version_text}\n"}
+            fast.store_rendered(rendered)
+            sys.stdout.write(rendered[query])
+            sys.exit(0)
+        with self.profiler.phase("load command plugin"):
+            self._load_lazy_command(args)
         try:
             options = self.parser.parse_args(args)
         except LumaArgumentError as e:
@@ -177,22 +312,32 @@ class Core:
         )
 
         try:
-            self._reforge_interpreter_env(options.python_path)
-            self._load_luma_file(self.project_root / "luma.toml")
-            self._load_components()
-            self._bootstrap_luma_file()
-            f(self, options)
+            with self.profiler.phase("reforge interpreter"):
+                self._reforge_interpreter_env(options.python_path)
+            with self.profiler.phase("load luma.toml"):
+                self._load_luma_file(self.project_root / "luma.toml")
+            with self.profiler.phase("load components"):
+                self._load_components()
+            with self.profiler.phase("bootstrap luma.toml"):
+                self._bootstrap_luma_file()
+            with self.profiler.phase("command handler"):
+                f(self, options)
         except Exception as exc:
             should_show_tb = not isinstance(exc, LumaError)
             if self.ui.verbosity > term.Verbosity.NORMAL and should_show_tb:
+                from rich.traceback import Traceback
+
                 self.ui.echo(Traceback(), err=True)
                 sys.exit(1)
             self.ui.echo(rf"[error]\[{exc.__class__.__name__}][/]: {exc}", err=True)
             if should_show_tb:
                 self.ui.echo("Add '-v' to see the detailed traceback", style="warning", err=True)
             sys.exit(1)
+        finally:
+            self.profiler.report(self.ui)
 
 
 def main(args: list[str] | None = None) -> None:
     """The CLI entry function"""
-    return Core().main(args)
+    args = args or sys.argv[1:]
+    return Core(profiler=StartupProfiler.from_args(args)).main(args)
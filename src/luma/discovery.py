@@ -0,0 +1,122 @@
+"""Saya module discovery"""
+
+from __future__ import annotations
+
+import importlib
+import importlib.util
+import os
+import pkgutil
+from contextlib import suppress
+from dataclasses import dataclass
+from pathlib import Path
+
+from luma.cache import dump_cache, interpreter_tag, load_cache, project_cache_dir
+from luma.content import LumaConfig, MultiModule, SingleModule
+from luma.term import UI
+
+
+def _mtime(path: str) -> int | None:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+@dataclass
+class DiscoveryEntry:
+    # Walked directories and their immediate subdirectories, with their mtimes
+    dirs: dict[str, int | None]
+    modules: list[str]
+    invalid: list[str]
+
+    def is_fresh(self) -> bool:
+        return all(_mtime(path) == mtime for path, mtime in self.dirs.items())
+
+
+class ModuleIndex:
+    """Index of the modules found by expanding `MultiModule`s.
+
+    An entry is reused as long as none of the walked directories changed,
+    which also detects added subpackages and modules.
+    """
+
+    def __init__(self, cache_path: Path | None = None) -> None:
+        self.cache_path: Path | None = cache_path
+        self.entries: dict[str, DiscoveryEntry] = {}
+        if cache_path:
+            self.entries = load_cache(cache_path, interpreter_tag()) or {}
+        self.changed: bool = False
+
+    @staticmethod
+    def walk(mod: MultiModule) -> DiscoveryEntry:
+        iter_pth = [mod.endpoint]
+        with suppress(ImportError):
+            iter_pth = list(importlib.import_module(mod.endpoint).__path__)
+        dirs: dict[str, int | None] = {}
+        for path in iter_pth:
+            dirs[path] = _mtime(path)
+            with suppress(OSError), os.scandir(path) as it:
+                dirs.update((entry.path, entry.stat().st_mtime_ns) for entry in it if entry.is_dir())
+        modules: list[str] = []
+        invalid: list[str] = []
+        for mod_info in pkgutil.iter_modules(iter_pth):
+            if mod_info.name in mod.exclude:
+                continue
+            candidate_name = f"{mod.endpoint}.{mod_info.name}"
+            (modules if importlib.util.find_spec(candidate_name) is not None else invalid).append(candidate_name)
+        return DiscoveryEntry(dirs, modules, invalid)
+
+    def expand(self, mod: MultiModule) -> DiscoveryEntry:
+        key = "\0".join([mod.endpoint, *sorted(mod.exclude)])
+        entry = self.entries.get(key)
+        if entry is None or not entry.is_fresh():
+            entry = self.entries[key] = self.walk(mod)
+            self.changed = True
+        return entry
+
+    def save(self) -> None:
+        if self.cache_path and self.changed:
+            dump_cache(self.cache_path, interpreter_tag(), self.entries)
+            self.changed = False
+
+
+def module_sources(name: str) -> list[str]:
+    """Find the source files of a module without importing it, including every file in packages.
+
+    Parent packages of dotted names are imported, like `importlib.util.find_spec` does.
+    """
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    if spec.submodule_search_locations:
+        sources: list[str] = []
+        for location in spec.submodule_search_locations:
+            for root, dirs, files in os.walk(location):
+                dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+                sources.extend(os.path.join(root, file) for file in sorted(files) if file.endswith(".py"))
+        return sources
+    if spec.origin and spec.origin.endswith(".py"):
+        return [spec.origin]
+    return []
+
+
+def resolve_modules(config: LumaConfig, ui: UI, project_root: Path | None = None) -> list[str]:
+    """Resolve the names of all the Saya modules to require.
+
+    :param project_root: if given, `MultiModule` expansions are indexed under its cache directory.
+    """
+    index = ModuleIndex(project_root and project_cache_dir(project_root) / "modules.pickle")
+    require_modules: list[str] = []
+    for mod in config.modules:
+        if isinstance(mod, SingleModule):
+            require_modules.append(mod.endpoint)
+            ui.echo(f"Adding module [info]{mod.endpoint}[/info]", verbosity=2)
+            continue
+        entry = index.expand(mod)
+        for candidate_name in entry.invalid:
+            ui.echo(f"[warning]{candidate_name} is invalid module, skipping")
+        for candidate_name in entry.modules:
+            require_modules.append(candidate_name)
+            ui.echo(f"Adding module [info]{candidate_name}[/info]")
+    index.save()
+    return require_modules
@@ -1,26 +1,173 @@
 from __future__ import annotations
 
+import asyncio
+import inspect
+import threading
+from contextlib import contextmanager
 from dataclasses import dataclass
-from typing import Callable
+from functools import lru_cache, partial
+from typing import Any, Callable, Dict, Iterator, Sequence, Tuple
 
+from luma.exceptions import LumaConfigError
 from luma.term import UI
-from luma.utils import cp_field
+from luma.utils import cp_field, load_from_string
+
+# Arguments of a recorded `HookManager.add_hook` call
+HookCall = Tuple[Tuple[Any, ...], Dict[str, Any]]
+
+# Memoised, so that endpoints shared by hooks are only resolved once
+resolve_endpoint = lru_cache(maxsize=None)(load_from_string)
+
+
+class LazyEndpoint:
+    """Proxy of a hook function given by its endpoint, imported on first use"""
+
+    def __init__(self, endpoint: str) -> None:
+        self.endpoint = endpoint
+        self.__module__, _, self.__qualname__ = endpoint.partition(":")
+
+    def resolve(self) -> Callable:
+        try:
+            func = resolve_endpoint(self.endpoint)
+        except (ImportError, AttributeError) as e:
+            raise LumaConfigError(f"Unable to load hook {self.endpoint!r}: {e}") from e
+        if not callable(func):
+            raise LumaConfigError(f"Hook {self.endpoint!r} is not callable")
+        return func
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        return self.resolve()(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        return f"<LazyEndpoint {self.endpoint}>"
+
+
+@dataclass
+class HookEntry:
+    """A hook function with its scheduling options.
+
+    Hooks run in the order they are added, unless they are `concurrent` or declare hooks to run `after`:
+    those only wait for the hooks they name and run alongside the others.
+    """
+
+    func: Callable
+    name: str = ""
+    after: Sequence[str] = ()
+    concurrent: bool = False
+
+    def __post_init__(self) -> None:
+        self.name = self.name or f"{self.func.__module__}:{self.func.__qualname__}"
+
+    @property
+    def target(self) -> Callable:
+        """The hook function, resolving lazy endpoints"""
+        return self.func.resolve() if isinstance(self.func, LazyEndpoint) else self.func
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        return self.target(*args, **kwargs)
+
+    @property
+    def is_async(self) -> bool:
+        return inspect.iscoroutinefunction(self.target)
+
+    @property
+    def is_plain(self) -> bool:
+        return not (self.concurrent or self.after or self.is_async)
 
 
 @dataclass
 class HookTarget:
     name: str
-    pre: list[Callable] = cp_field([])
-    core: list[Callable] = cp_field([])
-    post: list[Callable] = cp_field([])
+    pre: list[HookEntry] = cp_field([])
+    core: list[HookEntry] = cp_field([])
+    post: list[HookEntry] = cp_field([])
 
     def warn_hooks(self, ui: UI, pre: bool = False, post: bool = False) -> None:
         if pre and self.pre:
             for pre_fn in self.pre:
-                ui.echo(f"[warning]pre_{self.name} hook {pre_fn.__module__}:{pre_fn.__qualname__} is not invoked!")
+                ui.echo(f"[warning]pre_{self.name} hook {pre_fn.name} is not invoked!")
         if post and self.post:
             for post_fn in self.post:
-                ui.echo(f"[warning]post{self.name} hook {post_fn.__module__}:{post_fn.__qualname__} is not invoked!")
+                ui.echo(f"[warning]post{self.name} hook {post_fn.name} is not invoked!")
+
+    def invoke(self, stage: str, *args: Any) -> None:
+        """Run the hooks of a stage with the arguments.
+
+        Lazy endpoints are resolved here, so failing to load them only fails the stages that run.
+        Plain synchronous hooks are called one by one outside the event loop given by creart,
+        which runs the other hooks in between.
+        """
+        entries: list[HookEntry] = getattr(self, stage)
+        if all(entry.is_plain for entry in entries):
+            for entry in entries:
+                entry(*args)
+            return
+        import creart
+
+        loop = creart.it(asyncio.AbstractEventLoop)
+        self._schedule(loop, f"{stage}_{self.name}", entries, args)
+
+    def _schedule(
+        self, loop: asyncio.AbstractEventLoop, stage: str, entries: list[HookEntry], args: tuple[Any, ...]
+    ) -> None:
+        indexes = {entry.name: index for index, entry in reversed(list(enumerate(entries)))}
+        dependencies: list[list[int]] = []
+        ordered: list[int] = []
+        for index, entry in enumerate(entries):
+            missing = [name for name in entry.after if name not in indexes]
+            if missing:
+                raise LumaConfigError(f"Hook {entry.name} of {stage} runs after unknown hooks: {', '.join(missing)}")
+            dependencies.append([indexes[name] for name in entry.after])
+            if not (entry.concurrent or entry.after):
+                # Keep the order of hooks not opting in
+                if ordered:
+                    dependencies[index].append(ordered[-1])
+                ordered.append(index)
+
+        futures: dict[int, asyncio.Future] = {}
+        visiting: set[int] = set()
+
+        async def run(entry: HookEntry, waits: list[asyncio.Future]) -> None:
+            if waits:
+                await asyncio.gather(*waits)
+            if entry.is_async:
+                await entry(*args)
+            elif entry.concurrent:
+                await loop.run_in_executor(None, partial(entry, *args))
+            else:
+                entry(*args)
+
+        def schedule(index: int) -> asyncio.Future:
+            if index in futures:
+                return futures[index]
+            if index in visiting:
+                raise LumaConfigError(f"Hooks of {stage} depend on each other through {entries[index].name}")
+            visiting.add(index)
+            if entries[index].is_plain:
+                # Called in order outside the loop, resolved once it returns
+                futures[index] = loop.create_future()
+            else:
+                waits = [schedule(dependency) for dependency in dependencies[index]]
+                futures[index] = loop.create_task(run(entries[index], waits))
+            return futures[index]
+
+        try:
+            for index in range(len(entries)):
+                schedule(index)
+            for index in ordered:
+                entry = entries[index]
+                if not entry.is_plain:
+                    continue
+                # Run the loop until the previous hook is done, so that this one may run the loop itself
+                if dependencies[index]:
+                    loop.run_until_complete(futures[dependencies[index][0]])
+                entry(*args)
+                futures[index].set_result(None)
+            loop.run_until_complete(asyncio.gather(*futures.values()))
+        finally:
+            for future in futures.values():
+                future.cancel()
+            loop.run_until_complete(asyncio.gather(*futures.values(), return_exceptions=True))
 
 
 class HookManager:
@@ -28,19 +175,51 @@ class HookManager:
         self.targets: dict[str, HookTarget] = {}
         self.ui: UI = ui
         self.locked: bool = False
+        self._recording = threading.local()
+
+    @contextmanager
+    def record(self) -> Iterator[list[HookCall]]:
+        """Record the hooks added by the current thread instead of adding them, to replay them in a given order"""
+        calls: list[HookCall] = []
+        self._recording.calls = calls
+        try:
+            yield calls
+        finally:
+            del self._recording.calls
 
-    def add_hook(self, target: str, func: Callable, exclusive: bool = False) -> None:
+    def replay(self, calls: list[HookCall]) -> None:
+        for args, kwargs in calls:
+            self.add_hook(*args, **kwargs)
+
+    def add_hook(
+        self,
+        target: str,
+        func: Callable,
+        exclusive: bool = False,
+        *,
+        name: str = "",
+        after: Sequence[str] = (),
+        concurrent: bool = False,
+    ) -> None:
+        """Add a hook to a target, prefixed by `pre_` or `post_` for its other stages.
+
+        :param name: referred to by the `after` of other hooks, `<module>:<qualname>` of the function by default.
+        :param after: names of the hooks of the same stage to run before this one.
+        :param concurrent: run alongside the other hooks, waiting for the ones in `after` only.
+        """
+        if (calls := getattr(self._recording, "calls", None)) is not None:
+            calls.append(((target, func, exclusive), {"name": name, "after": after, "concurrent": concurrent}))
+            return
         stage = "core"
         if target.startswith(("pre_", "post_")):
-            stage = target[:3]
-            target = target[4:]
+            stage, _, target = target.partition("_")
         hook_target = self.targets.setdefault(target, HookTarget(target))
-        target_fns: list[Callable] = getattr(hook_target, stage)
-        if func in target_fns and exclusive:
+        target_fns: list[HookEntry] = getattr(hook_target, stage)
+        if exclusive and any(entry.func is func for entry in target_fns):
             return
-        target_fns.append(func)
+        entry = HookEntry(func, name, tuple(after), concurrent)
+        target_fns.append(entry)
         self.ui.echo(
-            f"Adding [primary]{func.__module__}:{func.__qualname__}[/primary] "
-            f"to [req]{stage}[/req] of [info]{target}[/info]",
+            f"Adding [primary]{entry.name}[/primary] to [req]{stage}[/req] of [info]{target}[/info]",
             verbosity=2,
         )
@@ -0,0 +1,65 @@
+"""Event loop configured by `luma.toml`"""
+
+from __future__ import annotations
+
+import asyncio
+from asyncio import AbstractEventLoop
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from luma.content import Loop
+from luma.exceptions import LumaConfigError
+from luma.utils import load_from_string
+
+
+def load_endpoint(endpoint: str, option: str) -> Any:
+    try:
+        return load_from_string(endpoint)
+    except (ImportError, AttributeError) as e:
+        raise LumaConfigError(f"Unable to load run.loop.{option} {endpoint!r}: {e}") from e
+
+
+def create_loop(settings: Loop) -> AbstractEventLoop:
+    """Create a loop of the configured implementation, which is `asyncio`, `uvloop` or a factory endpoint"""
+    if settings.implementation == "asyncio":
+        loop = asyncio.new_event_loop()
+    elif settings.implementation == "uvloop":
+        try:
+            import uvloop
+        except ImportError as e:
+            raise LumaConfigError("uvloop is not installed") from e
+        loop = uvloop.new_event_loop()
+    else:
+        loop = load_endpoint(settings.implementation, "implementation")()
+        if not isinstance(loop, AbstractEventLoop):
+            raise LumaConfigError(f"{settings.implementation!r} did not create an event loop but {loop!r}")
+    loop.set_debug(settings.debug)
+    if settings.slow_callback_duration is not None:
+        # Only reported in debug mode
+        loop.slow_callback_duration = settings.slow_callback_duration
+    if settings.executor_workers:
+        loop.set_default_executor(
+            ThreadPoolExecutor(max_workers=settings.executor_workers, thread_name_prefix="luma-executor")
+        )
+    if settings.task_factory:
+        loop.set_task_factory(load_endpoint(settings.task_factory, "task_factory"))
+    return loop
+
+
+def install_loop(settings: Loop) -> AbstractEventLoop | None:
+    """Install the configured loop as the current one and the one given by creart.
+
+    Nothing is done with the default settings, leaving the loop to creart.
+    """
+    if settings == Loop():
+        return None
+    import creart
+
+    loop = create_loop(settings)
+    asyncio.set_event_loop(loop)
+    # creart returns the current loop unless it already created one
+    if creart.it(AbstractEventLoop) is not loop:
+        asyncio.set_event_loop(None)
+        loop.close()
+        raise LumaConfigError("An event loop was created before the run.loop settings could be applied")
+    return loop
@@ -0,0 +1,186 @@
+"""Concurrent pre-import of the third-party dependencies of Saya modules"""
+
+from __future__ import annotations
+
+import ast
+import importlib
+import importlib.util
+import os
+import sys
+import sysconfig
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from luma.cache import digest, dump_cache, interpreter_tag, load_cache
+from luma.content import Preload
+from luma.discovery import module_sources
+from luma.term import UI
+
+# Preloading must save this fraction of the import time to stay enabled in "auto" mode
+AUTO_THRESHOLD = 0.05
+# Weight of the latest run in the smoothed import times
+SMOOTHING = 0.3
+STDLIB_PATHS = tuple(
+    os.path.normcase(os.path.realpath(sysconfig.get_paths()[name])) + os.sep for name in ("stdlib", "platstdlib")
+)
+SITE_DIRS = ("site-packages", "dist-packages")
+
+
+def is_type_checking(test: ast.expr) -> bool:
+    """Whether the condition is `TYPE_CHECKING` or `typing.TYPE_CHECKING`"""
+    if isinstance(test, ast.Attribute):
+        return test.attr == "TYPE_CHECKING" and isinstance(test.value, ast.Name) and test.value.id == "typing"
+    return isinstance(test, ast.Name) and test.id == "TYPE_CHECKING"
+
+
+def top_level_imports(tree: ast.Module) -> Iterator[str]:
+    """Yield the absolute imports executed when the module is imported, including conditional ones"""
+    statements: list[ast.stmt] = list(tree.body)
+    while statements:
+        node = statements.pop(0)
+        if isinstance(node, ast.Import):
+            yield from (alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if not node.level and node.module:
+                yield node.module
+        elif isinstance(node, ast.If):
+            # Imports for type checkers are never executed
+            statements.extend(node.orelse if is_type_checking(node.test) else [*node.body, *node.orelse])
+        elif isinstance(node, ast.Try):
+            statements.extend([*node.body, *node.orelse, *node.finalbody])
+            for handler in node.handlers:
+                statements.extend(handler.body)
+
+
+def is_third_party(name: str, project_root: Path) -> bool:
+    """Whether the top-level package of name is installed outside the standard library and the project"""
+    if sys.version_info >= (3, 10) and name in sys.stdlib_module_names:
+        return False
+    try:
+        spec = importlib.util.find_spec(name)
+    except (ImportError, ValueError):
+        return False
+    if spec is None or spec.origin in ("built-in", "frozen"):
+        return False
+    # Namespace packages like `graia` have no origin, only the directories of their portions
+    locations = [spec.origin] if spec.origin not in (None, "namespace") else list(spec.submodule_search_locations or ())
+    project = os.path.normcase(os.path.realpath(project_root)) + os.sep
+    for location in locations:
+        path = os.path.normcase(os.path.realpath(location))
+        if path.startswith(STDLIB_PATHS) and not any(site_dir in path for site_dir in SITE_DIRS):
+            return False
+        if path.startswith(project):
+            return False
+    return bool(locations)
+
+
+class Preloader:
+    """Imports the dependencies of Saya modules in a thread pool before they are required.
+
+    Imports doing I/O or loading C extensions release the GIL, so independent ones can overlap.
+    In "auto" mode, the import time is measured with and without preloading,
+    and preloading stays enabled only when it is measurably faster.
+    """
+
+    def __init__(self, settings: Preload, ui: UI, project_root: Path, cache_path: Path | None = None) -> None:
+        self.settings = settings
+        self.ui = ui
+        self.project_root = project_root
+        self.cache_path = cache_path
+        data = (cache_path and load_cache(cache_path, interpreter_tag())) or {}
+        # Source file -> (mtime, top-level imports)
+        self.imports: dict[str, tuple[int, list[str]]] = data.get("imports", {})
+        # Dependency set digest -> {preloaded: smoothed import time}
+        self.timings: dict[str, dict[bool, float]] = data.get("timings", {})
+        self.dependencies: list[str] = []
+        self.key: str = ""
+        self.enabled: bool = False
+
+    def scan(self, path: str) -> list[str]:
+        mtime = os.stat(path).st_mtime_ns
+        cached = self.imports.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        with open(path, "rb") as f:
+            try:
+                names = list(dict.fromkeys(top_level_imports(ast.parse(f.read(), path))))
+            except (SyntaxError, ValueError):
+                names = []
+        self.imports[path] = (mtime, names)
+        return names
+
+    def find_dependencies(self, modules: Iterable[str]) -> list[str]:
+        """Find the not yet imported third-party modules imported by the modules"""
+        names: dict[str, None] = {}
+        for module in modules:
+            try:
+                sources = module_sources(module)
+            except (ImportError, ValueError):
+                continue
+            for path in sources:
+                try:
+                    names.update(dict.fromkeys(self.scan(path)))
+                except OSError:
+                    continue
+        excluded = set(self.settings.exclude)
+        third_party: dict[str, bool] = {}
+        dependencies: list[str] = []
+        for name in names:
+            top = name.partition(".")[0]
+            if name in sys.modules or name in excluded or top in excluded:
+                continue
+            if top not in third_party:
+                third_party[top] = is_third_party(top, self.project_root)
+            if third_party[top]:
+                dependencies.append(name)
+        return dependencies
+
+    def plan(self, modules: Iterable[str]) -> bool:
+        """Decide whether to preload the dependencies of the modules"""
+        if self.settings.enabled is False:
+            return False
+        self.dependencies = self.find_dependencies(modules)
+        self.key = digest(*sorted(self.dependencies))
+        if not self.dependencies:
+            self.enabled = False
+        elif self.settings.enabled is True:
+            self.enabled = True
+        elif len(self.dependencies) < 2:
+            # Nothing to overlap
+            self.enabled = False
+        else:
+            timings = self.timings.get(self.key, {})
+            if True not in timings or False not in timings:
+                # Measure both modes first
+                self.enabled = True not in timings
+            else:
+                self.enabled = timings[True] < timings[False] * (1 - AUTO_THRESHOLD)
+        return self.enabled
+
+    def preload(self) -> None:
+        workers = min(self.settings.workers or (os.cpu_count() or 1) + 4, len(self.dependencies))
+        self.ui.echo(
+            f"Preloading [req]{len(self.dependencies)}[/req] dependencies with {workers} thread(s)", verbosity=1
+        )
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="luma-preload") as executor:
+            futures = {name: executor.submit(importlib.import_module, name) for name in self.dependencies}
+        for name, future in futures.items():
+            if (error := future.exception()) is not None:
+                # The module is imported again by Saya, which reports the actual error
+                self.ui.echo(f"[warning]Unable to preload [info]{name}[/info]: {error!r}", verbosity=1)
+        self.ui.echo(f"Preloaded in {(time.perf_counter() - start) * 1e3:.2f}ms", verbosity=2)
+
+    def record(self, seconds: float) -> None:
+        """Record the time spent importing the modules, including preloading"""
+        if self.settings.enabled != "auto" or not self.dependencies:
+            return
+        timings = self.timings.setdefault(self.key, {})
+        previous = timings.get(self.enabled)
+        timings[self.enabled] = seconds if previous is None else previous + (seconds - previous) * SMOOTHING
+
+    def save(self) -> None:
+        if self.cache_path:
+            dump_cache(self.cache_path, interpreter_tag(), {"imports": self.imports, "timings": self.timings})
@@ -0,0 +1,305 @@
+"""Startup profiling"""
+
+from __future__ import annotations
+
+import contextlib
+import importlib.abc
+import json
+import sys
+import threading
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Iterator, Sequence
+
+if TYPE_CHECKING:
+    from importlib.machinery import ModuleSpec
+    from types import ModuleType
+
+    from luma.term import UI
+
+PROFILE_OPTION = "--profile-startup"
+IMPORTS_OPTION = "--profile-imports"
+JSON_OPTION = "--profile-json"
+
+
+@dataclass
+class ImportRecord:
+    module: str
+    self_time: float
+    total_time: float
+
+
+@dataclass
+class PhaseRecord:
+    name: str
+    depth: int
+    wall_time: float = 0.0
+    cpu_time: float = 0.0
+    imports: list[ImportRecord] = field(default_factory=list)
+    # Still running when reported, with the time elapsed so far
+    in_progress: bool = False
+
+
+@dataclass
+class RequireRecord:
+    module: str
+    wall_time: float = 0.0
+    cpu_time: float = 0.0
+    # Net size of the blocks allocated while importing, and their peak if the interpreter can measure it
+    memory: int = 0
+    peak_memory: int | None = None
+    # Modules imported for the first time by this one
+    imported: list[str] = field(default_factory=list)
+    error: str | None = None
+
+
+class TimedLoader:
+    """Loader proxy timing `exec_module`, restoring the real loader afterwards"""
+
+    def __init__(self, loader: Any, timer: ImportTimer) -> None:
+        self.loader = loader
+        self.timer = timer
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.loader, name)
+
+    def create_module(self, spec: ModuleSpec) -> ModuleType | None:
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module: ModuleType) -> None:
+        stack = self.timer.stack
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            self.loader.exec_module(module)
+        finally:
+            total = time.perf_counter() - start
+            children = stack.pop()
+            if stack:
+                stack[-1] += total
+            self.timer.profiler.add_import(ImportRecord(module.__name__, total - children, total))
+            if module.__spec__ is not None and module.__spec__.loader is self:
+                module.__spec__.loader = self.loader
+            if getattr(module, "__loader__", None) is self:
+                module.__loader__ = self.loader
+
+
+class ImportTimer(importlib.abc.MetaPathFinder):
+    """Meta path finder recording the execution time of each imported module, like `-X importtime`"""
+
+    def __init__(self, profiler: StartupProfiler) -> None:
+        self.profiler = profiler
+        self._local = threading.local()
+
+    @property
+    def stack(self) -> list[float]:
+        """Cumulative times of the children of the modules being imported by the current thread"""
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def find_spec(self, fullname: str, path: Sequence[str] | None, target: ModuleType | None = None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            if (spec := finder.find_spec(fullname, path, target)) is not None:
+                break
+        else:
+            return None
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = TimedLoader(spec.loader, self)
+        return spec
+
+
+class StartupProfiler:
+    """Records wall and CPU time of the phases of Luma's startup.
+
+    It does nothing unless enabled, so phases can be marked unconditionally.
+    """
+
+    def __init__(self) -> None:
+        self.enabled: bool = False
+        self.output: Path | None = None
+        self.records: list[PhaseRecord] = []
+        self.unattributed_imports: list[ImportRecord] = []
+        self.reported: bool = False
+        # Phases being recorded by each thread
+        self._stacks: dict[int, list[PhaseRecord]] = {}
+        # Start of the phases being recorded, with the clock of their CPU time
+        self._starts: dict[int, tuple[float, float, Callable[[], float]]] = {}
+        self._import_timer: ImportTimer | None = None
+
+    @classmethod
+    def from_args(cls, args: Sequence[str]) -> StartupProfiler:
+        """Enable the profiler as early as possible, before the arguments are parsed"""
+        profiler = cls()
+        for index, arg in enumerate(args):
+            if arg == PROFILE_OPTION:
+                profiler.enable(profiler.output)
+            elif arg == IMPORTS_OPTION:
+                profiler.enable(profiler.output, import_times=True)
+            elif arg == JSON_OPTION and index + 1 < len(args):
+                profiler.enable(args[index + 1])
+            elif arg.startswith(f"{JSON_OPTION}="):
+                profiler.enable(arg.partition("=")[2])
+        return profiler
+
+    def enable(self, output: str | Path | None = None, import_times: bool = False) -> None:
+        self.enabled = True
+        self.output = Path(output) if output else None
+        if import_times and self._import_timer is None:
+            self._import_timer = ImportTimer(self)
+            sys.meta_path.insert(0, self._import_timer)
+
+    @property
+    def _active(self) -> list[PhaseRecord]:
+        return self._stacks.setdefault(threading.get_ident(), [])
+
+    def add_import(self, record: ImportRecord) -> None:
+        (self._active[-1].imports if self._active else self.unattributed_imports).append(record)
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        depth, cpu_clock = len(self._active), time.process_time
+        if threading.current_thread() is not threading.main_thread():
+            # Nested in the phase the main thread is in, which waits for this one
+            depth += len(self._stacks.get(threading.main_thread().ident or 0, ()))
+            cpu_clock = time.thread_time
+        record = PhaseRecord(name, depth)
+        self.records.append(record)
+        self._active.append(record)
+        wall, cpu = time.perf_counter(), cpu_clock()
+        self._starts[id(record)] = (wall, cpu, cpu_clock)
+        try:
+            yield
+        finally:
+            record.wall_time = time.perf_counter() - wall
+            record.cpu_time = cpu_clock() - cpu
+            record.in_progress = False
+            del self._starts[id(record)]
+            self._active.pop()
+
+    def report(self, ui: UI, top_imports: int = 20) -> None:
+        """Display or write the phases, only once, with the elapsed time of the ones still running"""
+        if not self.enabled or self.reported:
+            return
+        self.reported = True
+        if self._import_timer in sys.meta_path:
+            sys.meta_path.remove(self._import_timer)
+        now, cpu_now = time.perf_counter(), time.process_time()
+        for stack in self._stacks.values():
+            for record in stack:
+                wall, cpu, cpu_clock = self._starts[id(record)]
+                record.in_progress = True
+                record.wall_time = now - wall
+                # The CPU time of other threads can't be read from this one
+                if cpu_clock is time.process_time:
+                    record.cpu_time = cpu_now - cpu
+        records = self.records
+        imports = [*self.unattributed_imports, *(imp for record in records for imp in record.imports)]
+        if self.output:
+            data = {
+                "phases": [asdict(record) for record in records],
+                "unattributed_imports": [asdict(imp) for imp in self.unattributed_imports],
+            }
+            self.output.write_text(json.dumps(data, indent=2), encoding="utf-8")
+            ui.echo(f"[info]Startup profile written to [req]{self.output}[/req]", err=True)
+            return
+        ui.display_columns(
+            [
+                [
+                    f"{'  ' * record.depth}{record.name}{' (in progress)' if record.in_progress else ''}",
+                    f"{record.wall_time * 1e3:.2f}",
+                    f"{record.cpu_time * 1e3:.2f}",
+                    str(len(record.imports)),
+                ]
+                for record in records
+            ],
+            ["Phase", ">Wall (ms)", ">CPU (ms)", ">Imports"],
+        )
+        if imports:
+            imports.sort(key=lambda imp: imp.self_time, reverse=True)
+            ui.display_columns(
+                [
+                    [imp.module, f"{imp.self_time * 1e3:.2f}", f"{imp.total_time * 1e3:.2f}"]
+                    for imp in imports[:top_imports]
+                ],
+                ["Module", ">Self (ms)", ">Cumulative (ms)"],
+            )
+
+
+class ImportReport:
+    """Measures the time and memory spent importing each Saya module, including transitive imports.
+
+    Modules imported by a Saya module are attributed to it if they were not imported before.
+    """
+
+    def __init__(self, output: Path | None = None) -> None:
+        self.output: Path | None = output
+        self.records: list[RequireRecord] = []
+        self._started_tracing: bool = False
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def stop(self) -> None:
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    @contextlib.contextmanager
+    def measure(self, module: str) -> Iterator[None]:
+        record = RequireRecord(module)
+        self.records.append(record)
+        known = set(sys.modules)
+        if hasattr(tracemalloc, "reset_peak"):  # Python 3.9+
+            tracemalloc.reset_peak()
+        memory = tracemalloc.get_traced_memory()[0]
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        except Exception as e:
+            record.error = repr(e)
+            raise
+        finally:
+            record.wall_time = time.perf_counter() - wall
+            record.cpu_time = time.process_time() - cpu
+            current, peak = tracemalloc.get_traced_memory()
+            record.memory = current - memory
+            if hasattr(tracemalloc, "reset_peak"):
+                record.peak_memory = peak - memory
+            record.imported = sorted(name for name in set(sys.modules) - known if name != module)
+
+    def report(self, ui: UI) -> None:
+        """Display the records sorted by wall time and write them as JSON if an output is set"""
+        self.stop()
+        records = sorted(self.records, key=lambda record: record.wall_time, reverse=True)
+        ui.display_columns(
+            [
+                [
+                    f"[error]{record.module}" if record.error else record.module,
+                    f"{record.wall_time * 1e3:.2f}",
+                    f"{record.cpu_time * 1e3:.2f}",
+                    f"{record.memory / 1024:.1f}",
+                    "-" if record.peak_memory is None else f"{record.peak_memory / 1024:.1f}",
+                    str(len(record.imported)),
+                ]
+                for record in records
+            ],
+            ["Module", ">Wall (ms)", ">CPU (ms)", ">Memory (KiB)", ">Peak (KiB)", ">Imports"],
+        )
+        if self.output:
+            self.output.parent.mkdir(parents=True, exist_ok=True)
+            data = {
+                "total_time": sum(record.wall_time for record in records),
+                "modules": [asdict(record) for record in records],
+            }
+            self.output.write_text(json.dumps(data, indent=2), encoding="utf-8")
+            ui.echo(f"[info]Import report written to [req]{self.output}[/req]", err=True)
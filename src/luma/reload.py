@@ -0,0 +1,236 @@
+"""Hot reload of Saya modules"""
+
+from __future__ import annotations
+
+import abc
+import ctypes
+import ctypes.util
+import importlib
+import os
+import select
+import struct
+import sys
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Iterable, Sequence
+
+from luma.discovery import module_sources
+from luma.term import UI
+
+if TYPE_CHECKING:
+    from asyncio import AbstractEventLoop
+
+    from graia.saya import Saya
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class Watcher(abc.ABC):
+    """Calls back with the changed files among paths, from a daemon thread"""
+
+    # Seconds to wait for changes before checking whether the watcher is stopped
+    interval: float = 0.5
+
+    def __init__(self, paths: Iterable[str | Path], callback: Callable[[set[str]], None], debounce: float = 0.1):
+        self.paths: set[str] = {os.path.abspath(path) for path in paths}
+        self.callback = callback
+        self.debounce = debounce
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="luma-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self) -> None:
+        try:
+            while not self._stopped.is_set():
+                changed = self.poll(self.interval)
+                if not changed:
+                    continue
+                # Editors may write a file in several steps, coalesce them
+                while more := self.poll(self.debounce):
+                    changed |= more
+                self.callback(changed)
+        finally:
+            self.close()
+
+    @abc.abstractmethod
+    def poll(self, timeout: float) -> set[str]:
+        """Wait up to timeout seconds for changes, returning the changed paths"""
+
+    def close(self) -> None:
+        pass
+
+
+class PollingWatcher(Watcher):
+    """Compares the modification time and size of the files periodically"""
+
+    interval = 1.0
+
+    def __init__(self, paths: Iterable[str | Path], callback: Callable[[set[str]], None], debounce: float = 0.1):
+        super().__init__(paths, callback, debounce)
+        self.stats = {path: self.stat(path) for path in self.paths}
+
+    @staticmethod
+    def stat(path: str) -> tuple[int, int] | None:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def poll(self, timeout: float) -> set[str]:
+        if self._stopped.wait(timeout):
+            return set()
+        changed: set[str] = set()
+        for path, previous in self.stats.items():
+            if (current := self.stat(path)) != previous:
+                self.stats[path] = current
+                changed.add(path)
+        return changed
+
+
+class InotifyWatcher(Watcher):
+    """Watches the parent directories of the files with inotify, so files replaced by editors are followed"""
+
+    mask = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+    def __init__(self, paths: Iterable[str | Path], callback: Callable[[set[str]], None], debounce: float = 0.1):
+        super().__init__(paths, callback, debounce)
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd: int = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.dirs: dict[int, str] = {}
+        try:
+            for directory in {os.path.dirname(path) for path in self.paths}:
+                wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), self.mask)
+                if wd < 0:
+                    errno = ctypes.get_errno()
+                    raise OSError(errno, f"Unable to watch {directory}: {os.strerror(errno)}")
+                self.dirs[wd] = directory
+        except BaseException:
+            os.close(self.fd)
+            raise
+
+    def poll(self, timeout: float) -> set[str]:
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        changed: set[str] = set()
+        offset = 0
+        while offset < len(data):
+            wd, _, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            if wd in self.dirs and name:
+                path = os.path.join(self.dirs[wd], os.fsdecode(name))
+                if path in self.paths:
+                    changed.add(path)
+        return changed
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def create_watcher(paths: Iterable[str | Path], callback: Callable[[set[str]], None], polling: bool = False) -> Watcher:
+    """Create a watcher using inotify on Linux, falling back to polling"""
+    paths = list(paths)
+    if not polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(paths, callback)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(paths, callback)
+
+
+class Reloader:
+    """Reloads changed Saya modules on the event loop, restarting Luma when its configuration changes.
+
+    Only the changed Saya modules are reinstalled, so the connections of Launart components stay up.
+    """
+
+    def __init__(
+        self,
+        ui: UI,
+        saya: Saya,
+        loop: AbstractEventLoop,
+        modules: Iterable[str],
+        restart_files: Iterable[str | Path],
+        restart_argv: Sequence[str],
+    ) -> None:
+        self.ui = ui
+        self.saya = saya
+        self.loop = loop
+        self.sources: dict[str, str] = {}
+        # Nested modules own their files, rather than their parent packages
+        for module in sorted(modules, key=len):
+            try:
+                self.sources.update((os.path.abspath(path), module) for path in module_sources(module))
+            except (ImportError, ValueError) as e:
+                ui.echo(f"[warning]Unable to watch module [info]{module}[/info]: {e!r}", err=True)
+        self.restart_files = {os.path.abspath(path) for path in restart_files}
+        self.restart_argv = list(restart_argv)
+        self.watcher = create_watcher([*self.sources, *self.restart_files], self.on_change)
+
+    def start(self) -> None:
+        self.ui.echo(
+            f"[info]Watching [req]{len(self.watcher.paths)}[/req] files with {type(self.watcher).__name__}", verbosity=1
+        )
+        self.watcher.start()
+
+    def on_change(self, paths: set[str]) -> None:
+        if paths & self.restart_files:
+            self.loop.call_soon_threadsafe(self.restart, sorted(paths & self.restart_files))
+            return
+        modules = sorted({self.sources[path] for path in paths if path in self.sources})
+        if modules:
+            self.loop.call_soon_threadsafe(self.reload, modules)
+
+    def reload(self, modules: list[str]) -> None:
+        importlib.invalidate_caches()
+        with self.saya.module_context():
+            for module in modules:
+                # Saya only forgets the module itself, submodules of packages have to be imported again too
+                for name in [name for name in sys.modules if name.startswith(f"{module}.")]:
+                    del sys.modules[name]
+                channel = self.saya.channels.get(module)
+                try:
+                    if channel is None:
+                        # The previous reload failed after uninstalling it
+                        self.saya.require(module)
+                    else:
+                        self.saya.reload_channel(channel)
+                except Exception as e:
+                    self.ui.echo(f"[error]Failed to reload [info]{module}[/info]: {e!r}", err=True)
+                else:
+                    self.ui.echo(f"[info]Reloaded module [req]{module}")
+
+    def restart(self, paths: list[str]) -> None:
+        self.ui.echo(f"[info]{', '.join(paths)} changed, restarting [primary]Luma[/primary]")
+        if os.name != "posix":
+            self.ui.echo("[warning]Restarting is only supported on POSIX, restart Luma to apply the changes")
+            return
+        self.watcher.stop()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.execv(self.restart_argv[0], self.restart_argv)
@@ -0,0 +1,154 @@
+"""Sampling profiler for a running bot"""
+
+from __future__ import annotations
+
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from types import CodeType, FrameType
+from typing import Any, Iterable
+
+TOGGLE_SIGNAL = "SIGUSR1"
+TRUNCATED = "[truncated]"
+
+_current: SamplingProfiler | None = None
+
+
+class SamplingProfiler:
+    """Samples the stacks of all threads with `sys._current_frames` from a background thread.
+
+    Stacks are aggregated as collapsed stacks, prefixed by the thread name and the Saya channel
+    owning the innermost frame of one of its modules. Once `max_stacks` distinct stacks are recorded,
+    new ones are counted as truncated, so memory stays bounded. No thread runs while stopped.
+    """
+
+    def __init__(self, output_dir: Path, modules: Iterable[str] = (), interval: float = 0.005, max_stacks: int = 10000):
+        self.output_dir = output_dir
+        self.modules = set(modules)
+        self.interval = interval
+        self.max_stacks = max_stacks
+        self.stacks: Counter[str] = Counter()
+        self.samples: int = 0
+        self.started: float = 0.0
+        self._labels: dict[CodeType, tuple[str, str | None]] = {}
+        self._thread_names: dict[int, str] = {}
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> bool:
+        with self._lock:
+            if self._thread is not None:
+                return False
+            self.stacks.clear()
+            self.samples = 0
+            self.started = time.time()
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="luma-sampler", daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self) -> Path | None:
+        """Stop sampling and write the collapsed stacks, returning their path"""
+        with self._lock:
+            if self._thread is None:
+                return None
+            self._stopped.set()
+            self._thread.join()
+            self._thread = None
+            return self.write()
+
+    def toggle(self) -> Path | None:
+        """Start sampling, or stop it and return the path of the written stacks"""
+        if self.running:
+            return self.stop()
+        self.start()
+        return None
+
+    def label(self, code: CodeType, frame: FrameType) -> tuple[str, str | None]:
+        """Label of the code and the Saya channel it belongs to"""
+        cached = self._labels.get(code)
+        if cached is None:
+            module = frame.f_globals.get("__name__") or "?"
+            channel = next(
+                (name for name in self.modules if module == name or module.startswith(f"{name}.")),
+                None,
+            )
+            if len(self._labels) >= self.max_stacks:
+                self._labels.clear()
+            cached = self._labels[code] = (f"{module}:{code.co_name}", channel)
+        return cached
+
+    def thread_name(self, ident: int) -> str:
+        name = self._thread_names.get(ident)
+        if name is None:
+            self._thread_names = {thread.ident: thread.name for thread in threading.enumerate() if thread.ident}
+            name = self._thread_names.setdefault(ident, f"thread-{ident}")
+        return name
+
+    def sample(self) -> None:
+        own = threading.get_ident()
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            labels: list[str] = []
+            channel: str | None = None
+            current: FrameType | None = frame
+            while current is not None:
+                label, frame_channel = self.label(current.f_code, current)
+                labels.append(label)
+                channel = channel or frame_channel
+                current = current.f_back
+            prefix = [self.thread_name(ident)]
+            if channel:
+                prefix.append(f"channel:{channel}")
+            stack = ";".join([*prefix, *reversed(labels)])
+            if stack not in self.stacks and len(self.stacks) >= self.max_stacks:
+                stack = f"{prefix[0]};{TRUNCATED}"
+            self.stacks[stack] += 1
+        self.samples += 1
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            self.sample()
+
+    def write(self) -> Path:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        path = self.output_dir / time.strftime("profile-%Y%m%d-%H%M%S.collapsed", time.localtime(self.started))
+        with path.open("w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        self.stacks.clear()
+        return path
+
+
+def current() -> SamplingProfiler | None:
+    """The profiler installed by `luma run`, if any"""
+    return _current
+
+
+def install(output_dir: Path, modules: Iterable[str] = (), ui: Any = None) -> SamplingProfiler:
+    """Install the profiler, toggled by SIGUSR1 where available unless a handler is already installed"""
+    global _current
+    profiler = _current = SamplingProfiler(output_dir, modules)
+    sig = getattr(signal, TOGGLE_SIGNAL, None)
+    if sig is not None and signal.getsignal(sig) is not signal.SIG_DFL:
+        if ui is not None:
+            ui.echo(f"[warning]{TOGGLE_SIGNAL} is handled by the bot, the sampling profiler can't be toggled by it")
+    elif sig is not None:
+
+        def toggle() -> None:
+            path = profiler.toggle()
+            if ui is not None:
+                ui.echo(f"[info]Profile written to [req]{path}[/req]" if path else "[info]Sampling profiler started")
+
+        # The interrupted code may hold the lock of the profiler, so toggle it from another thread
+        signal.signal(sig, lambda *_: threading.Thread(target=toggle, name="luma-sampler-toggle").start())
+    return profiler
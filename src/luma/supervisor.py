@@ -0,0 +1,252 @@
+"""Supervision of worker processes"""
+
+from __future__ import annotations
+
+import abc
+import gc
+import os
+import signal
+import subprocess
+import sys
+import time
+import traceback
+from dataclasses import dataclass
+from pathlib import Path
+from types import FrameType
+from typing import Any, Callable, Protocol, Sequence
+
+from luma.exceptions import LumaError, LumaUsageError
+from luma.term import UI
+
+WORKER_ID_ENV = "LUMA_WORKER_ID"
+WORKER_COUNT_ENV = "LUMA_WORKER_COUNT"
+# Workers running longer than this are considered healthy, resetting their restart delay
+HEALTHY_UPTIME = 30.0
+MAX_RESTART_DELAY = 30.0
+
+
+def worker_shard() -> tuple[int, int] | None:
+    """The index of the current worker process and the number of workers, if running as a worker"""
+    worker_id, worker_count = os.getenv(WORKER_ID_ENV), os.getenv(WORKER_COUNT_ENV)
+    if worker_id is None or worker_count is None:
+        return None
+    return int(worker_id), int(worker_count)
+
+
+def worker_path(path: Path) -> Path:
+    """The path with the index of the current worker inserted before its suffix, so that workers don't share files"""
+    if (shard := worker_shard()) is None:
+        return path
+    return path.with_name(f"{path.stem}.worker-{shard[0]}{path.suffix}")
+
+
+class WorkerProcess(Protocol):
+    pid: int
+
+    def poll(self) -> int | None:
+        ...
+
+    def send_signal(self, sig: int) -> None:
+        ...
+
+
+@dataclass
+class Worker:
+    index: int
+    process: WorkerProcess | None = None
+    started: float = 0.0
+    failures: int = 0
+    restart_at: float = 0.0
+    returncode: int | None = None
+    restart_requested: bool = False
+
+
+class Supervisor(abc.ABC):
+    """Runs worker processes, restarting the crashed ones and forwarding termination signals.
+
+    Workers exiting successfully are not restarted. Subclasses decide how workers are spawned.
+    """
+
+    # Signals forwarded to the workers, which then stop supervising
+    stop_signals: tuple[str, ...] = ("SIGINT", "SIGTERM")
+    # Signals restarting every worker
+    restart_signals: tuple[str, ...] = ("SIGHUP",)
+
+    def __init__(self, ui: UI, count: int) -> None:
+        self.ui = ui
+        self.workers = [Worker(index) for index in range(count)]
+        self.stopping: bool = False
+
+    @abc.abstractmethod
+    def spawn(self, worker: Worker) -> WorkerProcess:
+        """Start the process of a worker"""
+
+    def worker_env(self, worker: Worker) -> dict[str, str]:
+        return {**os.environ, WORKER_ID_ENV: str(worker.index), WORKER_COUNT_ENV: str(len(self.workers))}
+
+    def start_worker(self, worker: Worker) -> None:
+        worker.process = self.spawn(worker)
+        worker.started = time.monotonic()
+        worker.returncode = None
+        worker.restart_requested = False
+        self.ui.echo(f"[info]Started worker [req]{worker.index}[/req] (pid {worker.process.pid})")
+
+    def on_exit(self, worker: Worker, returncode: int) -> None:
+        worker.process = None
+        worker.returncode = returncode
+        if worker.restart_requested and not self.stopping:
+            worker.restart_at = time.monotonic()
+            self.ui.echo(f"[info]Restarting worker [req]{worker.index}[/req]")
+            return
+        if self.stopping or returncode == 0:
+            self.ui.echo(f"[info]Worker [req]{worker.index}[/req] exited with code {returncode}")
+            return
+        if time.monotonic() - worker.started > HEALTHY_UPTIME:
+            worker.failures = 0
+        delay = min(2.0**worker.failures, MAX_RESTART_DELAY)
+        worker.failures += 1
+        worker.restart_at = time.monotonic() + delay
+        self.ui.echo(
+            f"[warning]Worker [req]{worker.index}[/req] exited with code {returncode}, restarting in {delay:.0f}s",
+            err=True,
+        )
+
+    def forward(self, sig: int) -> None:
+        if os.name != "posix" and sig == signal.SIGINT:
+            # The console already sends it to every process
+            return
+        for worker in self.workers:
+            if worker.process is not None:
+                try:
+                    worker.process.send_signal(sig)
+                except ProcessLookupError:
+                    pass
+
+    def handle_signal(self, sig: int, frame: FrameType | None) -> None:
+        self.stopping = True
+        self.forward(sig)
+
+    def handle_restart_signal(self, sig: int, frame: FrameType | None) -> None:
+        for worker in self.workers:
+            if worker.process is not None:
+                worker.restart_requested = True
+        # Stop gracefully, like Ctrl+C does
+        self.forward(signal.SIGINT)
+
+    def install_signal_handlers(self) -> dict[int, Any]:
+        previous: dict[int, Any] = {}
+        for names, handler in (
+            (self.stop_signals, self.handle_signal),
+            (self.restart_signals, self.handle_restart_signal),
+        ):
+            for name in names:
+                if (sig := getattr(signal, name, None)) is not None:
+                    previous[sig] = signal.signal(sig, handler)
+        return previous
+
+    def pending(self, worker: Worker) -> bool:
+        if worker.process is not None:
+            return True
+        return not self.stopping and (worker.restart_requested or worker.returncode not in (0, None))
+
+    def run(self) -> int:
+        """Supervise until all workers exit, returning the highest exit code"""
+        previous = self.install_signal_handlers()
+        try:
+            for worker in self.workers:
+                self.start_worker(worker)
+            while any(self.pending(worker) for worker in self.workers):
+                for worker in self.workers:
+                    if worker.process is not None:
+                        if (returncode := worker.process.poll()) is not None:
+                            self.on_exit(worker, returncode)
+                    elif self.pending(worker) and time.monotonic() >= worker.restart_at:
+                        self.start_worker(worker)
+                time.sleep(0.1)
+        finally:
+            for sig, handler in previous.items():
+                signal.signal(sig, handler)
+        return max((abs(worker.returncode or 0) for worker in self.workers), default=0)
+
+
+class SubprocessSupervisor(Supervisor):
+    """Runs workers as new interpreters with the given arguments"""
+
+    def __init__(self, ui: UI, count: int, argv: Sequence[str]) -> None:
+        super().__init__(ui, count)
+        self.argv = list(argv)
+
+    def spawn(self, worker: Worker) -> WorkerProcess:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        # Workers get signals from the supervisor only, so Ctrl+C is not received twice
+        return subprocess.Popen(self.argv, env=self.worker_env(worker), start_new_session=os.name == "posix")
+
+
+class ForkedProcess:
+    """Child process created by `os.fork`, with the interface of `subprocess.Popen` used by supervisors"""
+
+    def __init__(self, pid: int) -> None:
+        self.pid = pid
+        self.returncode: int | None = None
+
+    def poll(self) -> int | None:
+        if self.returncode is None:
+            pid, status = os.waitpid(self.pid, os.WNOHANG)
+            if pid:
+                # Like `os.waitstatus_to_exitcode`, which is only available since Python 3.9
+                self.returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+        return self.returncode
+
+    def send_signal(self, sig: int) -> None:
+        if self.returncode is None:
+            os.kill(self.pid, sig)
+
+
+class ForkSupervisor(Supervisor):
+    """Forks workers from the current process, which acts as a pre-warmed zygote.
+
+    Everything imported before `run` is shared by the workers, which only run the target.
+    """
+
+    def __init__(self, ui: UI, count: int, target: Callable[[], Any]) -> None:
+        if not hasattr(os, "fork"):
+            raise LumaUsageError("Forking workers is only supported on POSIX")
+        super().__init__(ui, count)
+        self.target = target
+
+    def run(self) -> int:
+        # Collections between freezing and forking would leave holes in the pages that workers share
+        gc.disable()
+        gc.collect()
+        return super().run()
+
+    def spawn(self, worker: Worker) -> WorkerProcess:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        # Keep the objects of the zygote out of the collections of workers, so their pages stay shared
+        gc.freeze()
+        pid = os.fork()
+        if pid:
+            return ForkedProcess(pid)
+        returncode = 1
+        try:
+            os.setsid()
+            for name in (*self.stop_signals, *self.restart_signals):
+                if (sig := getattr(signal, name, None)) is not None:
+                    signal.signal(sig, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+            gc.enable()
+            os.environ.update({WORKER_ID_ENV: str(worker.index), WORKER_COUNT_ENV: str(len(self.workers))})
+            self.target()
+            returncode = 0
+        except SystemExit as e:
+            returncode = e.code if isinstance(e.code, int) else int(e.code is not None)
+        except LumaError as e:
+            self.ui.echo(f"[error][{e.__class__.__name__}]: {e}", err=True)
+        except BaseException:
+            traceback.print_exc()
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(returncode)
@@ -5,18 +5,21 @@ from __future__ import annotations
 import atexit
 import contextlib
 import enum
+import functools
 import logging
 import os
+import re
+import sys
 from tempfile import mktemp
-from typing import Any, Iterator, Protocol, Sequence
+from typing import TYPE_CHECKING, Any, Iterator, Protocol, Sequence, TextIO
 
-from rich.box import ROUNDED
-from rich.console import Console
-from rich.progress import Progress, ProgressColumn
-from rich.table import Table
-from rich.theme import Theme
 from typing_extensions import Self
 
+if TYPE_CHECKING:
+    from rich.console import Console
+    from rich.progress import Progress, ProgressColumn
+    from rich.theme import Theme
+
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 logger.addHandler(logging.NullHandler())
@@ -29,35 +32,87 @@ DEFAULT_THEME = {
     "info": "blue",
     "req": "bold green",
 }
-_console = Console(highlight=False, theme=Theme(DEFAULT_THEME))
-_err_console = Console(stderr=True, theme=Theme(DEFAULT_THEME))
+# rich consoles are created on demand, as importing rich is expensive
+_consoles: dict[bool, Console] = {}
+_pushed_themes: list[Theme] = []
+# Keyword arguments of `Console.print` which plain text rendering can ignore
+PLAIN_PRINT_KWARGS = {"style", "end", "crop", "overflow", "highlight", "soft_wrap", "markup"}
+# Same as rich.markup.RE_TAGS
+RE_TAGS = re.compile(r"((\\*)\[([a-z#/@][^[]*?)])")
 
 
-class Spinner(Protocol):
-    def update(self, text: str, /) -> None:
-        ...
+def get_console(err: bool = False) -> Console:
+    """Get the rich console of stdout or stderr, creating it on first use"""
+    if err not in _consoles:
+        from rich.console import Console
+        from rich.theme import Theme
 
-    def __enter__(self) -> Self:
-        ...
+        theme = Theme(DEFAULT_THEME)
+        console = Console(stderr=True, theme=theme) if err else Console(highlight=False, theme=theme)
+        for theme in _pushed_themes:
+            console.push_theme(theme)
+        _consoles[err] = console
+    return _consoles[err]
 
-    def __exit__(self, typ, val, tb, /) -> None:
-        ...
+
+def _is_plain_stream(stream: TextIO) -> bool:
+    """Check if a stream is surely not a terminal, without asking rich.
+
+    Any variable rich uses to force terminal detection makes it defer to rich.
+    """
+    if any(os.getenv(var) for var in ("FORCE_COLOR", "TTY_COMPATIBLE", "TTY_INTERACTIVE")):
+        return False
+    try:
+        return not stream.isatty()
+    except (AttributeError, ValueError):
+        return False
+
+
+def strip_markup(text: str) -> str:
+    """Remove rich markup tags, handling escapes like `rich.markup.render` does"""
+    parts: list[str] = []
+    position = 0
+    for match in RE_TAGS.finditer(text):
+        full_text, escapes, _ = match.groups()
+        start, end = match.span()
+        parts.append(text[position:start].replace("\\[", "["))
+        backslashes, escaped = divmod(len(escapes), 2)
+        parts.append("\\" * backslashes)
+        if escaped:
+            parts.append(full_text[len(escapes) :])
+        position = end
+    parts.append(text[position:].replace("\\[", "["))
+    return "".join(parts)
 
 
 def is_interactive(console: Console | None = None) -> bool:
     """Check if the terminal is run under interactive mode"""
     if console is None:
-        console = _console
+        if _is_plain_stream(sys.stdout):
+            return False
+        console = get_console()
     return console.is_interactive
 
 
 def is_legacy_windows(console: Console | None = None) -> bool:
     """Legacy Windows renderer may have problem rendering emojis"""
     if console is None:
-        console = _console
+        if sys.platform != "win32":
+            return False
+        console = get_console()
     return console.legacy_windows
 
 
+@functools.lru_cache(maxsize=512)
+def _style(text: str, args: tuple[str, ...], style: str | None, terminal: tuple[bool, int] | None) -> str:
+    if terminal is None:
+        return " ".join(strip_markup(part) for part in (text, *args))
+    console = get_console()
+    with console.capture() as capture:
+        console.print(text, *args, end="", style=style)
+    return capture.get()
+
+
 def style(text: str, *args: str, style: str | None = None, **kwargs: Any) -> str:
     """return text with ansi codes using rich console
 
@@ -65,11 +120,33 @@ def style(text: str, *args: str, style: str | None = None, **kwargs: Any) -> str
     :param style: rich style to apply to whole string
     :return: string containing ansi codes
     """
-    with _console.capture() as capture:
-        _console.print(text, *args, end="", style=style, **kwargs)
+    if not kwargs:
+        # Keyed on the state of stdout too, which may change between calls
+        terminal = None
+        if not _is_plain_stream(sys.stdout):
+            console = get_console()
+            terminal = (console.is_terminal, console.width)
+        return _style(text, args, style, terminal)
+    console = get_console()
+    with console.capture() as capture:
+        console.print(text, *args, end="", style=style, **kwargs)
     return capture.get()
 
 
+def _print(message: Any, err: bool = False, **kwargs: Any) -> None:
+    """Print a message, rendering plain text directly when rich is unnecessary"""
+    stream = sys.stderr if err else sys.stdout
+    if isinstance(message, str) and PLAIN_PRINT_KWARGS.issuperset(kwargs) and _is_plain_stream(stream):
+        text = message if kwargs.get("markup") is False else strip_markup(message)
+        stream.write(text + kwargs.get("end", "\n"))
+        return
+    console = get_console(err)
+    if not console.is_interactive:
+        kwargs.setdefault("crop", False)
+        kwargs.setdefault("overflow", "ignore")
+    console.print(message, **kwargs)
+
+
 class Verbosity(enum.IntEnum):
     NORMAL = 0
     DETAIL = 1
@@ -104,6 +181,17 @@ class Emoji:
 SPINNER = "line" if is_legacy_windows() else "dots"
 
 
+class Spinner(Protocol):
+    def update(self, text: str, /) -> None:
+        ...
+
+    def __enter__(self) -> Self:
+        ...
+
+    def __exit__(self, typ, val, tb, /) -> None:
+        ...
+
+
 class DummySpinner:
     """A dummy spinner class implementing needed interfaces.
     But only display text onto screen.
@@ -113,7 +201,7 @@ class DummySpinner:
         self.text = text
 
     def _show(self) -> None:
-        _console.print(f"[primary]STATUS:[/] {self.text}")
+        _print(f"[primary]STATUS:[/] {self.text}")
 
     def update(self, text: str) -> None:
         self.text = text
@@ -141,8 +229,10 @@ class UI:
 
         :param theme: dict of theme
         """
-        _console.push_theme(theme)
-        _err_console.push_theme(theme)
+        _pushed_themes.append(theme)
+        for console in _consoles.values():
+            console.push_theme(theme)
+        _style.cache_clear()
 
     def echo(
         self,
@@ -158,11 +248,7 @@ class UI:
         :param verbosity: verbosity level, defaults to NORMAL.
         """
         if self.verbosity >= verbosity:
-            console = _err_console if err else _console
-            if not console.is_interactive:
-                kwargs.setdefault("crop", False)
-                kwargs.setdefault("overflow", "ignore")
-            console.print(message, **kwargs)
+            _print(message, err, **kwargs)
 
     def display_columns(self, rows: Sequence[Sequence[str]], header: list[str] | None = None) -> None:
         """Print rows in aligned columns.
@@ -170,6 +256,8 @@ class UI:
         :param rows: a rows of data to be displayed.
         :param header: a list of header strings.
         """
+        from rich.box import ROUNDED
+        from rich.table import Table
 
         if header:
             table = Table(box=ROUNDED)
@@ -188,7 +276,7 @@ class UI:
         for row in rows:
             table.add_row(*row)
 
-        _console.print(table)
+        get_console().print(table)
 
     @contextlib.contextmanager
     def logging(self, type_: str = "install") -> Iterator[logging.Logger]:
@@ -233,13 +321,15 @@ class UI:
         if self.verbosity >= Verbosity.DETAIL or not is_interactive():
             return DummySpinner(title)
         else:
-            return _console.status(title, spinner=SPINNER, spinner_style="primary")
+            return get_console().status(title, spinner=SPINNER, spinner_style="primary")
 
     def make_progress(self, *columns: str | ProgressColumn, **kwargs: Any) -> Progress:
         """create a progress instance for indented spinners"""
+        from rich.progress import Progress
+
         return Progress(
             *columns,
-            console=_console,
+            console=get_console(),
             disable=self.verbosity >= Verbosity.DETAIL,
             **kwargs,
         )
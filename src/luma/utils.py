@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import copy
 import importlib
+import logging
 import subprocess
 import sys
 from contextlib import suppress
@@ -9,8 +10,6 @@ from dataclasses import field
 from pathlib import Path
 from typing import Any, Literal
 
-import tomlkit
-
 
 def is_pipx_env() -> bool:
     return ("pipx", "venvs") in Path(sys.prefix).parts
@@ -49,3 +48,17 @@ def load_from_string(import_str: str) -> Any:
 
 def cp_field(value) -> Any:
     return field(default_factory=lambda: copy.deepcopy(value))
+
+
+def rotating_logger(name: str, log_file: Path, max_bytes: int, backup_count: int) -> logging.Logger:
+    """A logger writing to a rotating log file only, whose directory is created"""
+    from logging.handlers import RotatingFileHandler
+
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    log_file.parent.mkdir(parents=True, exist_ok=True)
+    file_handler = RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+    file_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+    logger.addHandler(file_handler)
+    return logger
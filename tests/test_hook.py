@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from luma.exceptions import LumaConfigError
+from luma.hook import HookManager
+from luma.term import UI
+
+
+@pytest.fixture
+def manager():
+    import creart
+
+    # Hooks are scheduled on the loop given by creart, which keeps the first one it creates
+    loop = creart.it(asyncio.AbstractEventLoop)
+    assert not loop.is_closed()
+    return HookManager(UI())
+
+
+def recorder(order, name, coroutine=False):
+    if coroutine:
+
+        async def hook(core, ctx):
+            order.append(name)
+
+    else:
+
+        def hook(core, ctx):
+            order.append(name)
+
+    return hook
+
+
+def test_plain_hooks_keep_order(manager):
+    order = []
+    for name in "abc":
+        manager.add_hook("pre_run", recorder(order, name), name=name)
+    manager.targets["run"].invoke("pre", None, {})
+    assert order == ["a", "b", "c"]
+
+
+def test_forward_after_reference(manager):
+    order = []
+    manager.add_hook("pre_run", recorder(order, "a"), name="a")
+    manager.add_hook("pre_run", recorder(order, "b"), name="b", after=["c"])
+    manager.add_hook("pre_run", recorder(order, "c"), name="c")
+    manager.targets["run"].invoke("pre", None, {})
+    assert sorted(order) == ["a", "b", "c"]
+    assert order.index("b") > order.index("c") > order.index("a")
+
+
+def test_async_hook_after(manager):
+    order = []
+    manager.add_hook("pre_run", recorder(order, "a", coroutine=True), name="a", after=["b"])
+    manager.add_hook("pre_run", recorder(order, "b", coroutine=True), name="b", concurrent=True)
+    manager.targets["run"].invoke("pre", None, {})
+    assert order == ["b", "a"]
+
+
+def test_cycle_and_unknown_after(manager):
+    manager.add_hook("pre_run", recorder([], "a"), name="a", after=["b"])
+    manager.add_hook("pre_run", recorder([], "b"), name="b", after=["a"])
+    with pytest.raises(LumaConfigError, match="depend on each other"):
+        manager.targets["run"].invoke("pre", None, {})
+    manager.add_hook("post_run", recorder([], "c"), name="c", after=["missing"])
+    with pytest.raises(LumaConfigError, match="unknown hooks: missing"):
+        manager.targets["run"].invoke("post", None, {})
+
+
+def test_plain_hooks_run_outside_loop(manager):
+    import creart
+
+    order = []
+
+    def run_loop(core, ctx):
+        # Plain hooks may block on the loop themselves, as in stages without async hooks
+        creart.it(asyncio.AbstractEventLoop).run_until_complete(asyncio.sleep(0))
+        order.append("sync")
+
+    manager.add_hook("pre_run", recorder(order, "first", coroutine=True), name="first")
+    manager.add_hook("pre_run", run_loop, name="sync")
+    manager.add_hook("pre_run", recorder(order, "last", coroutine=True), name="last")
+    manager.targets["run"].invoke("pre", None, {})
+    assert order == ["first", "sync", "last"]
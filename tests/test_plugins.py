@@ -0,0 +1,35 @@
+import argparse
+
+import importlib_metadata as pkg_meta
+
+import luma.core  # Imported first, as luma.cli.command needs it
+from luma.cli.command import Command
+
+
+class ExampleCommand(Command):
+    name = "example"
+    description = "An example command."
+
+    def handle(self, core: luma.core.Core, options: argparse.Namespace) -> None:
+        pass
+
+
+def command_plugin(core: luma.core.Core) -> None:
+    core.register_command(ExampleCommand)
+
+
+def component_plugin(core: luma.core.Core) -> None:
+    core.register_command(ExampleCommand)
+    core.component_handlers["example"] = lambda core, kwargs: None
+
+
+def load(name: str):
+    return luma.core.Core(lazy=True)._load_plugin(pkg_meta.EntryPoint(name, f"{__name__}:{name}", "luma.plugin"))
+
+
+def test_plugins_with_commands_only_are_deferred():
+    assert load("command_plugin") == [("example", "An example command.")]
+
+
+def test_plugins_registering_components_are_always_loaded():
+    assert load("component_plugin") == []
@@ -0,0 +1,24 @@
+import json
+
+from luma.profiling import StartupProfiler
+from luma.term import UI
+
+
+def test_report_keeps_open_phases(tmp_path):
+    output = tmp_path / "profile.json"
+    profiler = StartupProfiler()
+    profiler.enable(output)
+    with profiler.phase("bootstrap"):
+        pass
+    with profiler.phase("handler"):
+        with profiler.phase("import"):
+            pass
+        profiler.report(UI())
+
+    phases = json.loads(output.read_text("utf-8"))["phases"]
+    assert [(phase["name"], phase["depth"], phase["in_progress"]) for phase in phases] == [
+        ("bootstrap", 0, False),
+        ("handler", 0, True),
+        ("import", 1, False),
+    ]
+    assert phases[1]["wall_time"] >= phases[2]["wall_time"]